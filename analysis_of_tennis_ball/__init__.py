@@ -1,2 +1,3 @@
+from .heatmap_renderer import HeatmapAccumulator, build_colormap_lut
 from .heatmap_visualization import create_heatmap
 from .tennis_ball_analysis import detect_ball_hits
@@ -0,0 +1,95 @@
+import cv2
+import numpy as np
+
+# Same stops as the matplotlib 'tennis_cmap': dark blue, light blue, green, yellow, red (RGB)
+TENNIS_HEATMAP_COLORS = [(0, 0, 0.5), (0, 0.5, 1), (0, 1, 0), (1, 1, 0), (1, 0, 0)]
+
+
+def build_colormap_lut(colors=TENNIS_HEATMAP_COLORS):
+    stops = np.linspace(0, 1, len(colors))
+    positions = np.linspace(0, 1, 256)
+    rgb = np.column_stack([np.interp(positions, stops, [color[channel] for color in colors]) for channel in range(3)])
+    return np.round(rgb[:, ::-1] * 255).astype(np.uint8).reshape(256, 1, 3)
+
+
+class HeatmapAccumulator:
+    def __init__(self, mini_court, bins=60, scale=2, colors=TENNIS_HEATMAP_COLORS):
+        self.mini_court = mini_court
+        self.bins_x, self.bins_y = (bins, bins) if np.isscalar(bins) else bins
+        self.scale = scale
+        self.x_range = (mini_court.court_start_x, mini_court.court_end_x)
+        self.y_range = (mini_court.court_start_y, mini_court.court_end_y)
+        self.counts = np.zeros((self.bins_y, self.bins_x), dtype=np.int64)
+        self.lut = build_colormap_lut(colors)
+        self._background = None
+
+    def reset(self):
+        self.counts[:] = 0
+
+    def add_points(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        points = points[~np.isnan(points).any(axis=1)]
+        if len(points):
+            counts, _, _ = np.histogram2d(points[:, 1], points[:, 0], bins=(self.bins_y, self.bins_x),
+                                          range=(self.y_range, self.x_range))
+            self.counts += counts.astype(np.int64)
+
+    def add_point(self, x, y):
+        # Per-frame updates for live views; binning matches np.histogram2d, including the closed last edge
+        if np.isnan(x) or np.isnan(y):
+            return
+        if not (self.x_range[0] <= x <= self.x_range[1] and self.y_range[0] <= y <= self.y_range[1]):
+            return
+        column = min(int((x - self.x_range[0]) / (self.x_range[1] - self.x_range[0]) * self.bins_x), self.bins_x - 1)
+        row = min(int((y - self.y_range[0]) / (self.y_range[1] - self.y_range[0]) * self.bins_y), self.bins_y - 1)
+        self.counts[row, column] += 1
+
+    def render(self, colorbar_width=40):
+        mini_court = self.mini_court
+        court_image = self._get_background().copy()
+
+        max_count = int(self.counts.max())
+        intensity = np.zeros(self.counts.shape, dtype=np.uint8)
+        if max_count > 0:
+            intensity = np.round(self.counts * (255.0 / max_count)).astype(np.uint8)
+        x0, y0 = self._to_canvas(self.x_range[0], self.y_range[0])
+        x1, y1 = self._to_canvas(self.x_range[1], self.y_range[1])
+        heat = cv2.resize(intensity, (x1 - x0, y1 - y0), interpolation=cv2.INTER_NEAREST)
+        court_image[y0:y1, x0:x1] = cv2.applyColorMap(heat, self.lut)
+
+        keypoints = mini_court.keypoints.reshape(-1, 2)
+        for start, end in mini_court.lines:
+            cv2.line(court_image, self._to_canvas(*keypoints[start]), self._to_canvas(*keypoints[end]),
+                     (255, 255, 255), max(1, self.scale))
+        net_y = (keypoints[0][1] + keypoints[2][1]) / 2
+        cv2.line(court_image, self._to_canvas(keypoints[0][0], net_y), self._to_canvas(keypoints[1][0], net_y),
+                 (255, 200, 0), max(1, self.scale))
+
+        return np.hstack((court_image, self._render_colorbar(court_image.shape[0], colorbar_width, max_count)))
+
+    def save(self, output_path):
+        if not cv2.imwrite(output_path, self.render()):
+            raise ValueError(f"Could not write heatmap to {output_path}")
+        return output_path
+
+    def _to_canvas(self, x, y):
+        return (int(round((x - self.mini_court.start_x) * self.scale)),
+                int(round((y - self.mini_court.start_y) * self.scale)))
+
+    def _get_background(self):
+        if self._background is None:
+            width = (self.mini_court.end_x - self.mini_court.start_x) * self.scale
+            height = (self.mini_court.end_y - self.mini_court.start_y) * self.scale
+            self._background = np.full((height, width, 3), 255, dtype=np.uint8)
+        return self._background
+
+    def _render_colorbar(self, height, width, max_count):
+        colorbar = np.full((height, width, 3), 255, dtype=np.uint8)
+        margin = 20
+        gradient = np.linspace(255, 0, height - 2 * margin).astype(np.uint8).reshape(-1, 1)
+        colorbar[margin:height - margin, 4:width // 2] = cv2.applyColorMap(
+            np.repeat(gradient, width // 2 - 4, axis=1), self.lut
+        )
+        cv2.putText(colorbar, str(max_count), (2, margin - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 0), 1)
+        cv2.putText(colorbar, "0", (2, height - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 0), 1)
+        return colorbar
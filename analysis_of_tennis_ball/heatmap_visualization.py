@@ -1,23 +1,12 @@
 
-import pickle
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib
 import os
-from matplotlib.colors import LinearSegmentedColormap
 from mini_court import MiniCourt
-from court_line_detector import CourtLineDetector
+from .heatmap_renderer import HeatmapAccumulator, TENNIS_HEATMAP_COLORS
+from .plotting import get_pyplot
+from pipeline.analysis_context import load_tennis_ball_detections
 import cv2
 
-matplotlib.use('TkAgg')
-
-
-def load_tennis_ball_positions(stub_path):
-    if not os.path.exists(stub_path):
-        raise FileNotFoundError(f"Stub file not found: {stub_path}")
-    with open(stub_path, 'rb') as file:
-        return pickle.load(file)
-
 
 def load_video_frame(video_path):
     cap = cv2.VideoCapture(video_path)
@@ -41,9 +30,9 @@ def draw_court_lines(ax, mini_court):
     ax.plot([k[0], k[2]], [net_y, net_y], color='blue', linewidth=1)
 
 
-def generate_heatmap(xs, ys, mini_court, output_dir, video_name):
-    if not xs or not ys:
-        raise ValueError("No valid data points after conversion.")
+def show_heatmap_plots(xs, ys, mini_court):
+    plt = get_pyplot(interactive=True)
+    from matplotlib.colors import LinearSegmentedColormap
 
     fig, ax = plt.subplots(figsize=(6, 12))
     draw_court_lines(ax, mini_court)
@@ -52,11 +41,8 @@ def generate_heatmap(xs, ys, mini_court, output_dir, video_name):
     ax.invert_yaxis()
     plt.legend()
     plt.title('Raw Ball Positions on Mini-Court')
-    plt.show()
 
-    cmap = LinearSegmentedColormap.from_list(
-        'tennis_cmap', [(0, 0, 0.5), (0, 0.5, 1), (0, 1, 0), (1, 1, 0), (1, 0, 0)], N=256
-    )
+    cmap = LinearSegmentedColormap.from_list('tennis_cmap', TENNIS_HEATMAP_COLORS, N=256)
 
     fig, ax = plt.subplots(figsize=(6, 12))  # Tennis court is vertical
 
@@ -77,52 +63,68 @@ def generate_heatmap(xs, ys, mini_court, output_dir, video_name):
     ax.set_ylabel('Y Position')
     ax.set_aspect('equal', adjustable='box')
     ax.invert_yaxis()
+    plt.show()
+    plt.close('all')
+
+
+def generate_heatmap(xs, ys, mini_court, output_dir, video_name, show_plots=False):
+    if not len(xs) or not len(ys):
+        raise ValueError("No valid data points after conversion.")
+
+    heatmap = HeatmapAccumulator(mini_court)
+    heatmap.add_points(np.column_stack((xs, ys)))
 
     os.makedirs(output_dir, exist_ok=True)
     heatmap_path = os.path.join(output_dir, f'heatmap_for_{video_name}.png')
-    plt.savefig(heatmap_path, dpi=300)
-    plt.close()
+    heatmap.save(heatmap_path)
     print(f"Heatmap saved to {heatmap_path}")
 
+    # The interactive matplotlib windows block until closed, so they are only shown on request
+    if show_plots:
+        show_heatmap_plots(xs, ys, mini_court)
 
-def create_heatmap(video_name, output_dir=None):
+
+def create_heatmap(video_name, output_dir=None, context=None, show_plots=False):
     try:
-        stub_path = f'tracker_stub/tennis_ball_detections_for_{video_name}.pkl'
-        tennis_ball_positions = load_tennis_ball_positions(stub_path)
+        if context is not None:
+            mini_court = context.mini_court
+            mini_positions = context.project_to_mini_court(context.raw_tennis_ball_detections)
+        else:
+            from court_line_detector import CourtLineDetector
+
+            tennis_ball_positions = load_tennis_ball_detections(video_name)
 
-        frame_path = f'input_videos/{video_name}.mp4'
-        frame = load_video_frame(frame_path)
+            frame_path = f'input_videos/{video_name}.mp4'
+            frame = load_video_frame(frame_path)
 
-        court_detector = CourtLineDetector(model_path='models/tennis_court_keypoints_model.pth')
-        court_keypoints = court_detector.predict(frame)
+            court_detector = CourtLineDetector(model_path='models/tennis_court_keypoints_model.pth')
+            court_keypoints = court_detector.predict(frame)
 
-        if court_keypoints is None or len(court_keypoints) < 28:
-            raise ValueError("Court keypoints detection failed or incomplete.")
+            if court_keypoints is None or len(court_keypoints) < 28:
+                raise ValueError("Court keypoints detection failed or incomplete.")
 
-        mini_court = MiniCourt(frame)
-        mini_positions = mini_court.convert_bounding_boxes_to_mini_court_coordinates(
-            tennis_ball_positions, court_keypoints
-        )
+            mini_court = MiniCourt(frame)
+            mini_positions = mini_court.convert_bounding_boxes_to_mini_court_coordinates(
+                tennis_ball_positions, court_keypoints
+            )
 
-        xs, ys = [], []
-        for pos in mini_positions:
-            coords = pos.get(1)
-            if coords and not (np.isnan(coords[0]) or np.isnan(coords[1])):
-                xs.append(coords[0])
-                ys.append(coords[1])
+        valid_positions = mini_positions[~np.isnan(mini_positions).any(axis=1)]
+        xs, ys = valid_positions[:, 0], valid_positions[:, 1]
 
         if output_dir is None:
             output_dir = f'outputs/{video_name}'
 
-        generate_heatmap(xs, ys, mini_court, output_dir, video_name)
+        generate_heatmap(xs, ys, mini_court, output_dir, video_name, show_plots=show_plots)
 
     except Exception as e:
         print(f"Error: {e}")
 
 
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) < 2:
-        print("Usage: python heatmap_visualization.py <video_name>")
-    else:
-        create_heatmap(sys.argv[1])
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render the ball heatmap for a video from its cached detections.")
+    parser.add_argument("video_name", help="Video name without extension")
+    parser.add_argument("--show", action="store_true", help="Also open the interactive matplotlib plots")
+    args = parser.parse_args()
+    create_heatmap(args.video_name, show_plots=args.show)
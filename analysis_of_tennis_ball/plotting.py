@@ -0,0 +1,15 @@
+import os
+
+
+def get_pyplot(interactive=False):
+    # Imported on first use; Agg renders to files and works on servers without a display. Interactive callers get
+    # matplotlib's own backend choice back, so plt.show() opens a window wherever one can be opened
+    import matplotlib
+    if 'MPLBACKEND' not in os.environ:
+        if not interactive:
+            matplotlib.use('Agg')
+        elif matplotlib.get_backend().lower() == 'agg':
+            import matplotlib.pyplot as plt
+            plt.switch_backend(matplotlib.rcParamsOrig['backend'])
+    import matplotlib.pyplot as plt
+    return plt
@@ -1,83 +1,67 @@
-import pickle
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib
+import csv
 import os
+from bounding_boxes import as_ball_track, get_ball_track_centers, interpolate_ball_track
+from pipeline.analysis_context import load_tennis_ball_detections
+from utils import detect_direction_changes, get_vertical_movement
+from .plotting import get_pyplot
 
-matplotlib.use('Agg')
 
-
-def detect_ball_hits(video_name):
-    stub_path = f'tracker_stub/tennis_ball_detections_for_{video_name}.pkl'
-    output_dir = f'output_videos/{video_name}'
+def detect_ball_hits(video_name, context=None):
+    output_dir = context.output_dir if context is not None else f'output_videos/{video_name}'
     os.makedirs(output_dir, exist_ok=True)
 
-    if not os.path.exists(stub_path):
-        print(f"Stub file not found: {stub_path}")
-        return
-
-    with open(stub_path, 'rb') as file:
-        tennis_ball_positions = pickle.load(file)
-
-    tennis_ball_positions = [x.get(1, []) for x in tennis_ball_positions]
-    df = pd.DataFrame(tennis_ball_positions, columns=['x1', 'y1', 'x2', 'y2'])
-    df = df.interpolate().bfill()
+    if context is not None:
+        tennis_ball_positions = context.tennis_ball_detections
+    else:
+        try:
+            tennis_ball_positions = load_tennis_ball_detections(video_name)
+        except FileNotFoundError as e:
+            print(e)
+            return
 
-    df['center_x'] = (df['x1'] + df['x2']) / 2
-    df['center_y'] = (df['y1'] + df['y2']) / 2
-    df['center_y_rolling_mean'] = df['center_y'].rolling(window=5, min_periods=1).mean()
+    tennis_ball_track = interpolate_ball_track(as_ball_track(tennis_ball_positions))
+    centers = get_ball_track_centers(tennis_ball_track)
+    center_y_rolling_mean, delta_y = get_vertical_movement(centers[:, 1])
 
+    plt = get_pyplot()
     plt.figure()
-    plt.plot(df['center_y_rolling_mean'])
+    plt.plot(center_y_rolling_mean)
     plt.title('Smoothed Vertical Ball Movement')
     plt.xlabel('Frame')
     plt.ylabel('Center Y')
     plt.savefig(os.path.join(output_dir, 'smoothed_vertical_movement.png'))
     plt.close()
 
-    df['delta_y'] = df['center_y_rolling_mean'].diff()
-
     plt.figure()
-    plt.plot(df['delta_y'])
+    plt.plot(delta_y)
     plt.title('Delta Y between Frames')
     plt.xlabel('Frame')
     plt.ylabel('Delta Y')
     plt.savefig(os.path.join(output_dir, 'delta_y_between_frames.png'))
     plt.close()
 
-    df['tennis_ball_hit'] = 0
-    minimum_change_frames_for_hit = 25
-
-    for i in range(1, len(df) - int(minimum_change_frames_for_hit * 1.2)):
-        neg_change = df['delta_y'].loc[i] > 0 > df['delta_y'].loc[i + 1]
-        pos_change = df['delta_y'].loc[i] < 0 < df['delta_y'].loc[i + 1]
-
-        if neg_change or pos_change:
-            change_count = 0
-            for cf in range(i + 1, i + int(minimum_change_frames_for_hit * 1.2) + 1):
-                if cf >= len(df):
-                    break
-                neg_follow = df['delta_y'].loc[i] > 0 > df['delta_y'].loc[cf]
-                pos_follow = df['delta_y'].loc[i] < 0 < df['delta_y'].loc[cf]
-
-                if neg_change and neg_follow:
-                    change_count += 1
-                elif pos_change and pos_follow:
-                    change_count += 1
-
-            if change_count > minimum_change_frames_for_hit - 1:
-                df.at[i, 'tennis_ball_hit'] = 1
-
-    hits = df[df['tennis_ball_hit'] == 1]
+    if context is not None and context.tennis_ball_shot_frames is not None:
+        hit_frames = context.tennis_ball_shot_frames
+    else:
+        hit_frames = detect_direction_changes(delta_y)
+    hit_frames = [int(frame) for frame in hit_frames]
+    hit_centers = centers[hit_frames].reshape(-1, 2)
 
     print("Detected ball hits at frames:")
-    print(hits[['center_x', 'center_y', 'tennis_ball_hit']])
+    print(f"{'frame':>8} {'center_x':>10} {'center_y':>10}")
+    for frame, (center_x, center_y) in zip(hit_frames, hit_centers):
+        print(f"{frame:>8} {center_x:>10.1f} {center_y:>10.1f}")
 
+    # Same layout as the DataFrame.to_csv output it replaces: an unnamed frame column, then the centers
     hits_file = os.path.join(output_dir, 'detected_hits.txt')
-    hits[['center_x', 'center_y']].to_csv(hits_file, index=True)
+    with open(hits_file, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['', 'center_x', 'center_y'])
+        for frame, (center_x, center_y) in zip(hit_frames, hit_centers):
+            writer.writerow([frame, float(center_x), float(center_y)])
     print(f"Hit details saved to: {hits_file}")
 
-    return hits.index.tolist()
+    return hit_frames
 
 
 if __name__ == "__main__":
@@ -0,0 +1,211 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+RESULT_FILE_NAME = 'analysis_result.json'
+LOG_FILE_NAME = 'analysis.log'
+# Every worker builds its models with these settings, so they are part of the results fingerprint
+TENNIS_BALL_TRACKER_OPTIONS = {'conf': 0.15, 'backend': 'pytorch', 'input_size': 640}
+COURT_LINE_DETECTOR_OPTIONS = {'backend': 'pytorch'}
+
+_worker_models = {}
+
+
+def find_videos(source):
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, name) for name in os.listdir(source)
+                      if name.lower().endswith(VIDEO_EXTENSIONS))
+
+    # A manifest lists one video per line; relative paths are taken from the manifest's directory
+    manifest_dir = os.path.dirname(os.path.abspath(source))
+    video_paths = []
+    with open(source) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                video_paths.append(line if os.path.isabs(line) else os.path.join(manifest_dir, line))
+    return video_paths
+
+
+def get_video_name(video_path):
+    return os.path.splitext(os.path.basename(video_path))[0]
+
+
+def expected_outputs(video_name, output_dir):
+    return [
+        os.path.join(output_dir, f"{video_name}.avi"),
+        os.path.join(output_dir, f"mini_court_for_{video_name}.avi"),
+        os.path.join(output_dir, f"heatmap_for_{video_name}.png"),
+        os.path.join(output_dir, 'detected_hits.txt'),
+    ]
+
+
+def get_analysis_fingerprint(detection_cache):
+    # A result is only reused if it came from the same model weights and settings this batch would use
+    from pipeline.analysis_context import TENNIS_BALL_MODEL_PATH, COURT_KEYPOINTS_MODEL_PATH
+
+    fingerprint = hashlib.sha256()
+    for model_path in (TENNIS_BALL_MODEL_PATH, COURT_KEYPOINTS_MODEL_PATH):
+        if os.path.isfile(model_path):
+            fingerprint.update(detection_cache.get_file_digest(model_path).encode())
+        else:
+            fingerprint.update(str(model_path).encode())
+    fingerprint.update(json.dumps([TENNIS_BALL_TRACKER_OPTIONS, COURT_LINE_DETECTOR_OPTIONS], sort_keys=True).encode())
+    return fingerprint.hexdigest()
+
+
+def has_valid_result(output_dir, video_name, video_digest, fingerprint):
+    # Every expected output has to exist; the list recorded in the result only covers what the last run wrote
+    try:
+        with open(os.path.join(output_dir, RESULT_FILE_NAME)) as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (result.get('video_digest') == video_digest and result.get('fingerprint') == fingerprint
+            and all(os.path.exists(path) for path in expected_outputs(video_name, output_dir)))
+
+
+def init_worker(threads_per_worker):
+    # Must run before torch is imported in the worker so OpenMP picks up the limit
+    os.environ['OMP_NUM_THREADS'] = str(threads_per_worker)
+    os.environ['MKL_NUM_THREADS'] = str(threads_per_worker)
+    import cv2
+    import torch
+
+    cv2.setNumThreads(threads_per_worker)
+    torch.set_num_threads(threads_per_worker)
+    torch.set_num_interop_threads(1)
+
+
+def get_worker_models():
+    # Each worker process loads the models once and reuses them for every video it is given
+    if not _worker_models:
+        from court_line_detector import CourtLineDetector
+        from pipeline.analysis_context import TENNIS_BALL_MODEL_PATH, COURT_KEYPOINTS_MODEL_PATH
+        from trackers import TennisBallTracker, DetectionCache
+
+        _worker_models['tennis_ball_tracker'] = TennisBallTracker(model_path=TENNIS_BALL_MODEL_PATH,
+                                                                  **TENNIS_BALL_TRACKER_OPTIONS)
+        _worker_models['court_line_detector'] = CourtLineDetector(model_path=COURT_KEYPOINTS_MODEL_PATH,
+                                                                  **COURT_LINE_DETECTOR_OPTIONS)
+        _worker_models['detection_cache'] = DetectionCache()
+    return _worker_models
+
+
+def analyze_video(video_path, output_dir, video_digest, fingerprint):
+    import main
+    from pipeline import AnalysisContext
+
+    video_name = get_video_name(video_path)
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    with open(os.path.join(output_dir, LOG_FILE_NAME), 'w') as log_file:
+        with contextlib.redirect_stdout(log_file):
+            context = AnalysisContext(video_name, video_path=video_path, output_dir=output_dir, **get_worker_models())
+            main.main(video_name, context=context)
+    seconds = time.perf_counter() - start
+
+    result = {
+        'video_path': video_path,
+        'video_digest': video_digest,
+        'fingerprint': fingerprint,
+        'seconds': seconds,
+        'frame_count': context.frame_count,
+        'shot_count': len(context.tennis_ball_shot_frames),
+        'outputs': [path for path in expected_outputs(video_name, output_dir) if os.path.exists(path)],
+    }
+    with open(os.path.join(output_dir, RESULT_FILE_NAME), 'w') as f:
+        json.dump(result, f, indent=2)
+    return result
+
+
+def run_batch(video_paths, output_root="output_videos", workers=None, threads_per_worker=None, force=False):
+    from trackers import DetectionCache
+
+    workers = workers or max(1, (os.cpu_count() or 1) // 2)
+    threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+    detection_cache = DetectionCache()
+    fingerprint = get_analysis_fingerprint(detection_cache)
+
+    video_names = [get_video_name(video_path) for video_path in video_paths]
+    duplicates = sorted({name for name in video_names if video_names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Videos share an output name: {', '.join(duplicates)}")
+
+    summary = []
+    jobs = []
+    for video_path, video_name in zip(video_paths, video_names):
+        output_dir = os.path.join(output_root, video_name)
+        try:
+            video_digest = detection_cache.get_file_digest(video_path)
+        except OSError as e:
+            summary.append({'video_path': video_path, 'status': 'failed', 'seconds': 0.0, 'error': str(e)})
+            continue
+        if not force and has_valid_result(output_dir, video_name, video_digest, fingerprint):
+            summary.append({'video_path': video_path, 'status': 'skipped', 'seconds': 0.0, 'error': None})
+            continue
+        jobs.append((video_path, output_dir, video_digest, fingerprint))
+
+    batch_start = time.perf_counter()
+    if jobs:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=init_worker,
+                                 initargs=(threads_per_worker,)) as executor:
+            futures = {executor.submit(analyze_video, *job): job[0] for job in jobs}
+            for future in as_completed(futures):
+                video_path = futures[future]
+                try:
+                    result = future.result()
+                    entry = {'video_path': video_path, 'status': 'ok', 'seconds': result['seconds'], 'error': None,
+                             'frame_count': result['frame_count'], 'shot_count': result['shot_count']}
+                except Exception as e:
+                    entry = {'video_path': video_path, 'status': 'failed', 'seconds': 0.0, 'error': repr(e),
+                             'traceback': ''.join(traceback.format_exception(e))}
+                summary.append(entry)
+                print(f"[{entry['status']}] {video_path} ({entry['seconds']:.1f} s)", flush=True)
+
+    return {
+        'workers': workers,
+        'threads_per_worker': threads_per_worker,
+        'wall_seconds': time.perf_counter() - batch_start,
+        'videos': sorted(summary, key=lambda entry: entry['video_path']),
+    }
+
+
+def print_summary(batch_summary):
+    print(f"{'video':<40} {'status':>8} {'seconds':>10}")
+    for entry in batch_summary['videos']:
+        print(f"{os.path.basename(entry['video_path']):<40} {entry['status']:>8} {entry['seconds']:>10.1f}")
+    counts = {status: sum(entry['status'] == status for entry in batch_summary['videos'])
+              for status in ('ok', 'skipped', 'failed')}
+    print(f"{counts['ok']} analyzed, {counts['skipped']} skipped, {counts['failed']} failed in "
+          f"{batch_summary['wall_seconds']:.1f} s with {batch_summary['workers']} workers x "
+          f"{batch_summary['threads_per_worker']} threads")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze many match videos in parallel.")
+    parser.add_argument("source", help="Directory of videos or a manifest file with one video path per line")
+    parser.add_argument("--output-root", default="output_videos", help="Each video gets a subdirectory here")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: half the CPU cores)")
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="torch/OpenCV threads per worker (default: cores divided by workers)")
+    parser.add_argument("--force", action="store_true", help="Re-analyze videos that already have valid results")
+    parser.add_argument("--summary", default=None, help="Where to write the JSON summary "
+                                                       "(default: <output-root>/batch_summary.json)")
+    args = parser.parse_args()
+
+    batch_summary = run_batch(find_videos(args.source), args.output_root, args.workers, args.threads_per_worker,
+                              args.force)
+    print_summary(batch_summary)
+
+    summary_path = args.summary or os.path.join(args.output_root, 'batch_summary.json')
+    os.makedirs(os.path.dirname(summary_path) or '.', exist_ok=True)
+    with open(summary_path, 'w') as f:
+        json.dump(batch_summary, f, indent=2)
+    print(f"Summary written to {summary_path}")
@@ -0,0 +1,78 @@
+import argparse
+import numpy as np
+from benchmarks.metrics import center_agreement, time_best
+from court_line_detector import CourtLineDetector
+from process_video import sample_frames
+from trackers import TennisBallTracker
+
+
+def benchmark_court_backends(model_path, frames, configurations, calibration_frames, repeats):
+    results = []
+    reference = None
+    for backend, int8 in configurations:
+        court_line_detector = CourtLineDetector(model_path, backend=backend, int8=int8,
+                                                calibration_frames=calibration_frames)
+        court_line_detector.predict(frames[0])
+        keypoints, seconds = time_best(lambda: [court_line_detector.predict(frame) for frame in frames], repeats,
+                                       warmup=False)
+        keypoints = np.array(keypoints)
+        if reference is None:
+            reference = keypoints
+        results.append((backend, int8, seconds / len(frames), float(np.abs(keypoints - reference).mean())))
+    return results
+
+
+def benchmark_ball_backends(model_path, frames, configurations, calibration_frames, repeats, tolerance):
+    results = []
+    reference = None
+    for backend, int8 in configurations:
+        tennis_ball_tracker = TennisBallTracker(model_path, backend=backend, int8=int8,
+                                                calibration_frames=calibration_frames)
+        tennis_ball_tracker.detect_frames(frames[:1])
+        tennis_ball_track, seconds = time_best(lambda: tennis_ball_tracker.detect_frames(frames), repeats,
+                                               warmup=False)
+        if reference is None:
+            reference = tennis_ball_track
+        agreement = center_agreement(tennis_ball_track, reference, tolerance)
+        results.append((backend, int8, seconds / len(frames), agreement))
+    return results
+
+
+def print_results(title, metric_name, results):
+    print(title)
+    print(f"{'backend':<12} {'int8':>5} {'ms/frame':>10} {metric_name:>12}")
+    for backend, int8, seconds, metric in results:
+        print(f"{backend:<12} {str(int8):>5} {seconds * 1000:>10.2f} {metric:>12.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare ONNX Runtime and OpenVINO backends with the PyTorch models.")
+    parser.add_argument("--video", required=True, help="Video to sample benchmark and calibration frames from")
+    parser.add_argument("--ball-model", default="models/best.pt", help="YOLO weights for TennisBallTracker")
+    parser.add_argument("--court-model", default="models/tennis_court_keypoints_model.pth",
+                        help="Keypoint weights for CourtLineDetector")
+    parser.add_argument("--frames", type=int, default=32, help="Number of frames to benchmark on")
+    parser.add_argument("--calibration-frames", type=int, default=16, help="Number of frames used for int8 calibration")
+    parser.add_argument("--backends", nargs="+", default=["onnxruntime", "openvino"], help="Backends to compare")
+    parser.add_argument("--no-int8", action="store_true", help="Skip the int8 quantized variants")
+    parser.add_argument("--skip-ball", action="store_true", help="Only benchmark the court keypoint model")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per backend (best is reported)")
+    parser.add_argument("--tolerance", type=float, default=5.0, help="Max center distance in pixels for agreement")
+    args = parser.parse_args()
+
+    benchmark_frames = sample_frames(args.video, args.frames)
+    calibration = sample_frames(args.video, args.calibration_frames)
+    configurations = [('pytorch', False)]
+    for backend in args.backends:
+        configurations.append((backend, False))
+        if not args.no_int8:
+            configurations.append((backend, True))
+
+    print(f"Frames: {len(benchmark_frames)}, calibration frames: {len(calibration)}")
+    print_results("Court keypoints (mean abs diff in px vs pytorch)", "keypoint err",
+                  benchmark_court_backends(args.court_model, benchmark_frames, configurations, calibration,
+                                           args.repeats))
+    if not args.skip_ball:
+        print_results("Tennis ball detection (agreement with pytorch)", "agreement",
+                      benchmark_ball_backends(args.ball_model, benchmark_frames, configurations, calibration,
+                                              args.repeats, args.tolerance))
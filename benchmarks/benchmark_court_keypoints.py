@@ -0,0 +1,30 @@
+import argparse
+import numpy as np
+from benchmarks.metrics import time_best
+from court_line_detector import CourtLineDetector
+from process_video import sample_frames
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-frame and batched court keypoint prediction.")
+    parser.add_argument("--video", required=True, help="Video to sample frames from")
+    parser.add_argument("--model", default="models/tennis_court_keypoints_model.pth", help="Keypoint weights")
+    parser.add_argument("--frames", type=int, nargs="+", default=[1, 4, 8, 16], help="Sampled frame counts to compare")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per setting (best is reported)")
+    args = parser.parse_args()
+
+    court_line_detector = CourtLineDetector(model_path=args.model, batch_size=max(args.frames))
+    single_seconds = None
+
+    print(f"{'frames':>6} {'loop s':>10} {'batch s':>10} {'vs single':>10} {'median spread px':>18}")
+    for frame_count in args.frames:
+        frames = sample_frames(args.video, frame_count)
+        _, loop_seconds = time_best(lambda: [court_line_detector.predict(frame) for frame in frames], args.repeats)
+        _, batch_seconds = time_best(lambda: court_line_detector.predict_batch(frames), args.repeats)
+        if single_seconds is None:
+            single_seconds = loop_seconds / len(frames)
+
+        keypoints = court_line_detector.predict_batch(frames)
+        spread = np.abs(keypoints - np.median(keypoints, axis=0)).mean()
+        print(f"{len(frames):>6} {loop_seconds:>10.3f} {batch_seconds:>10.3f} "
+              f"{batch_seconds / single_seconds:>9.1f}x {spread:>18.2f}")
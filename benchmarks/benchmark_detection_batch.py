@@ -0,0 +1,50 @@
+import argparse
+import time
+import numpy as np
+from itertools import islice
+from process_video import iter_video
+from trackers import TennisBallTracker
+
+
+def load_benchmark_frames(video_path, frame_count, width=1280, height=720):
+    if video_path:
+        frames = list(islice(iter_video(video_path), frame_count))
+        if not frames:
+            raise ValueError(f"Could not read frames from {video_path}")
+        return frames
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(frame_count)]
+
+
+def benchmark_batch_sizes(tennis_ball_tracker, frames, batch_sizes, repeats=3):
+    results = []
+    for batch_size in batch_sizes:
+        tennis_ball_tracker.detect_frames(frames[:batch_size], batch_size=batch_size)
+
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            tennis_ball_tracker.detect_frames(frames, batch_size=batch_size)
+            timings.append(time.perf_counter() - start)
+
+        best = min(timings)
+        results.append((batch_size, best, len(frames) / best))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure tennis ball detection throughput for several batch sizes.")
+    parser.add_argument("--model", default="models/best.pt", help="YOLO weights used by TennisBallTracker")
+    parser.add_argument("--video", default=None, help="Video to sample frames from (random 1280x720 frames if omitted)")
+    parser.add_argument("--frames", type=int, default=64, help="Number of frames per run")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="Batch sizes to compare")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per batch size (best is reported)")
+    args = parser.parse_args()
+
+    tracker = TennisBallTracker(model_path=args.model)
+    tracker.model.to("cpu")
+    benchmark_frames = load_benchmark_frames(args.video, args.frames)
+
+    print(f"{'batch':>6} {'seconds':>10} {'frames/s':>10}")
+    for batch_size, seconds, fps in benchmark_batch_sizes(tracker, benchmark_frames, args.batch_sizes, args.repeats):
+        print(f"{batch_size:>6} {seconds:>10.3f} {fps:>10.2f}")
@@ -0,0 +1,55 @@
+import argparse
+import numpy as np
+import pandas as pd
+from benchmarks.metrics import time_best
+from utils import detect_direction_changes
+
+
+def legacy_direction_changes(delta_y, minimum_change_frames_for_hit=25):
+    hit_frames = []
+    for i in range(1, len(delta_y) - int(minimum_change_frames_for_hit * 1.2)):
+        neg_change = delta_y.iloc[i] > 0 > delta_y.iloc[i + 1]
+        pos_change = delta_y.iloc[i] < 0 < delta_y.iloc[i + 1]
+        if neg_change or pos_change:
+            change_count = 0
+            for cf in range(i + 1, i + int(minimum_change_frames_for_hit * 1.2) + 1):
+                neg_change_follow = delta_y.iloc[i] > 0 > delta_y.iloc[cf]
+                pos_change_follow = delta_y.iloc[i] < 0 < delta_y.iloc[cf]
+                if neg_change and neg_change_follow:
+                    change_count += 1
+                elif pos_change and pos_change_follow:
+                    change_count += 1
+            if change_count > minimum_change_frames_for_hit - 1:
+                hit_frames.append(i)
+    return hit_frames
+
+
+def generate_synthetic_delta_y(frame_count, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = np.arange(frame_count)
+    rally_length = rng.integers(40, 90)
+    center_y = 300 + 200 * np.abs(np.sin(np.pi * frames / rally_length))
+    center_y += rng.normal(0, 4, frame_count)
+    center_y[rng.random(frame_count) < 0.05] = np.nan
+    center_y = pd.Series(center_y).interpolate().bfill()
+    return center_y.rolling(window=5, min_periods=1).mean().diff()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the vectorized hit detection kernel with the legacy loop.")
+    parser.add_argument("--frames", type=int, default=100_000, help="Length of the synthetic trajectory")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic trajectory")
+    args = parser.parse_args()
+
+    delta_y = generate_synthetic_delta_y(args.frames, args.seed)
+    legacy_hits, legacy_seconds = time_best(lambda: legacy_direction_changes(delta_y), repeats=1, warmup=False)
+    vectorized_hits, vectorized_seconds = time_best(lambda: detect_direction_changes(delta_y.to_numpy()), repeats=1,
+                                                    warmup=False)
+
+    if legacy_hits != vectorized_hits:
+        raise AssertionError("Vectorized hit frames differ from the legacy implementation.")
+
+    print(f"Frames: {args.frames}, hits: {len(vectorized_hits)}")
+    print(f"Legacy loop:      {legacy_seconds:.3f} s")
+    print(f"Vectorized:       {vectorized_seconds * 1000:.2f} ms")
+    print(f"Speedup:          {legacy_seconds / vectorized_seconds:.0f}x")
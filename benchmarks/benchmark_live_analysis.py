@@ -0,0 +1,95 @@
+import argparse
+import time
+import numpy as np
+from benchmarks.synthetic_video import get_synthetic_court_keypoints
+from live_analysis import LiveAnalyzer
+
+
+class SyntheticCapture:
+    # Stands in for LiveCapture: the "frames" are their own indices and every drop_every-th frame is dropped, as the
+    # capture would when the analyzer falls behind
+    def __init__(self, frame_count, fps=30.0, frame_size=(1280, 720), drop_every=3):
+        self.frame_count = frame_count
+        self.fps = fps
+        self.frame_size = frame_size
+        self.scale = 1.0
+        self.drop_every = drop_every
+        self.frames_dropped = 0
+
+    def __iter__(self):
+        for frame_index in range(self.frame_count):
+            if frame_index > 1 and frame_index % self.drop_every == 0:
+                self.frames_dropped += 1
+                continue
+            yield frame_index, time.perf_counter(), frame_index
+
+    def pending(self):
+        return 0
+
+    def get_stats(self):
+        return {'frames_captured': self.frame_count, 'frames_dropped': self.frames_dropped}
+
+
+class SyntheticBallDetector:
+    # The ball moves steadily at a modest confidence; a static false positive outscores it from frame 2 on
+    def __init__(self, start_x=200.0, speed=3.0, distractor_x=100.0, y=360.0, size=10.0):
+        self.start_x = start_x
+        self.speed = speed
+        self.distractor_x = distractor_x
+        self.y = y
+        self.size = size
+
+    def get_ball_x(self, frame_index):
+        return self.start_x + self.speed * frame_index
+
+    def detect_frame_candidates(self, frame_index):
+        centers = [(self.get_ball_x(frame_index), 0.5)]
+        if frame_index > 1:
+            centers.append((self.distractor_x, 0.9))
+        half = self.size / 2
+        return np.array([[x - half, self.y - half, x + half, self.y + half, conf] for x, conf in centers])
+
+
+class SyntheticCourtDetector:
+    def __init__(self, frame_size):
+        self.court_keypoints = get_synthetic_court_keypoints(*frame_size)
+
+    def predict(self, frame):
+        return self.court_keypoints.copy()
+
+
+def run_live(frame_count, max_delay, max_lost_seconds):
+    capture = SyntheticCapture(frame_count)
+    ball_detector = SyntheticBallDetector()
+    analyzer = LiveAnalyzer(ball_detector, SyntheticCourtDetector(capture.frame_size), drop_policy='none',
+                            max_delay=max_delay, max_lost_seconds=max_lost_seconds)
+    tracked_xs = {}
+
+    def on_position(frame_index, box, valid, position):
+        if valid:
+            tracked_xs[frame_index] = (box[0] + box[2]) / 2
+
+    start = time.perf_counter()
+    result = analyzer.run(capture, report_every=0, on_position=on_position)
+    seconds = time.perf_counter() - start
+
+    # Only frames the detector actually saw are checked; gap frames may be predicted or held
+    frames = [frame_index for frame_index in tracked_xs if frame_index % capture.drop_every or frame_index <= 1]
+    errors = np.abs([tracked_xs[frame_index] - ball_detector.get_ball_x(frame_index) for frame_index in frames])
+    return errors.max(), result, seconds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that live analysis follows the ball past a stronger false "
+                                                 "positive while frames are dropped, and time its per-frame work.")
+    parser.add_argument("--frames", type=int, default=300, help="Length of the synthetic capture")
+    parser.add_argument("--max-lost-seconds", type=float, default=1.0, help="Lost-track limit to check")
+    args = parser.parse_args()
+
+    for max_delay in (0, 2):
+        error, result, seconds = run_live(args.frames, max_delay, args.max_lost_seconds)
+        if error > 1.0:
+            raise AssertionError(f"max_delay={max_delay}: the live track jumped to the distractor "
+                                 f"({error:.0f} px from the ball).")
+        print(f"max_delay={max_delay}: followed the ball with {result['capture']['frames_dropped']} frames dropped, "
+              f"{seconds / args.frames * 1000:.2f} ms/frame")
@@ -0,0 +1,103 @@
+import argparse
+import time
+import numpy as np
+from bounding_boxes import create_ball_track, get_ball_track_centers, interpolate_ball_track
+from trackers import OnlineBallTracker, interpolate_ball_track_online
+
+
+def make_box(center_x, center_y, size=10.0):
+    return [center_x - size / 2, center_y - size / 2, center_x + size / 2, center_y + size / 2]
+
+
+def generate_distractor_candidates(frame_count, start_x=100.0, speed=10.0, distractor_x=905.0, y=300.0):
+    # The ball moves steadily at a modest confidence; from frame 1 on a static false positive outscores it
+    candidates = []
+    for frame_index in range(frame_count):
+        frame_candidates = [make_box(start_x + speed * frame_index, y) + [0.5]]
+        if frame_index > 0:
+            frame_candidates.append(make_box(distractor_x, y) + [0.9])
+        candidates.append(np.array(frame_candidates))
+    return candidates
+
+
+def run_tracker(online_tracker, candidates):
+    rows = []
+    start = time.perf_counter()
+    for frame_index, frame_candidates in enumerate(candidates):
+        rows.extend(online_tracker.update(frame_index, frame_candidates))
+    rows.extend(online_tracker.flush())
+    return rows, time.perf_counter() - start
+
+
+def get_center_xs(rows):
+    return np.array([(box[0] + box[2]) / 2 if valid else np.nan for _, box, _, valid in rows])
+
+
+def check_distractor(frame_count, max_delay):
+    candidates = generate_distractor_candidates(frame_count)
+    rows, seconds = run_tracker(OnlineBallTracker(max_delay=max_delay), candidates)
+    expected = np.array([candidate[0, 0] + candidate[0, 2] for candidate in candidates]) / 2
+    if not np.allclose(get_center_xs(rows), expected):
+        raise AssertionError(f"max_delay={max_delay}: the track left the ball for the distractor.")
+    return seconds
+
+
+def generate_gap_track(segments, y=300.0):
+    # segments: (frames, start_x, speed, detected) runs; undetected runs are gaps
+    centers, valid = [], []
+    for frames, start_x, speed, detected in segments:
+        centers.extend(start_x + speed * np.arange(frames))
+        valid.extend([detected] * frames)
+    tennis_ball_track = create_ball_track(len(centers))
+    tennis_ball_track['box'] = [make_box(x, y) for x in centers]
+    tennis_ball_track['conf'] = 0.5
+    tennis_ball_track['valid'] = valid
+    tennis_ball_track['box'][~tennis_ball_track['valid']] = np.nan
+    return tennis_ball_track
+
+
+def check_short_gaps(max_delay):
+    # Gaps that fit in max_delay have to come out exactly as the offline interpolation fills them
+    segments = [(20, 100.0, 15.0, True)]
+    for gap in sorted({1, max(1, max_delay // 2), max_delay}):
+        segments += [(gap, 0.0, 0.0, False), (10, 400.0, -5.0, True)]
+    tennis_ball_track = generate_gap_track(segments)
+    online_track = interpolate_ball_track_online(tennis_ball_track, max_delay=max_delay)
+    if not np.allclose(online_track['box'], interpolate_ball_track(tennis_ball_track)['box']):
+        raise AssertionError(f"max_delay={max_delay}: short gaps differ from the offline interpolation.")
+
+
+def check_long_gap(max_delay, max_lost_frames, frame_size=(1280, 720), gap=200):
+    # The ball flies out of view towards the right and comes back elsewhere; predictions must stay in the frame and
+    # stop once the track is lost, instead of extrapolating for the whole gap
+    tennis_ball_track = generate_gap_track([(30, 100.0, 15.0, True), (gap, 0.0, 0.0, False), (30, 600.0, 0.0, True)])
+    online_track = interpolate_ball_track_online(tennis_ball_track, max_delay=max_delay,
+                                                 max_lost_frames=max_lost_frames, frame_size=frame_size)
+    offline_track = interpolate_ball_track(tennis_ball_track)
+
+    online_x = get_ball_track_centers(online_track)[:, 0]
+    if np.any(online_x[online_track['valid']] < 0) or np.any(online_x[online_track['valid']] > frame_size[0]):
+        raise AssertionError("Predicted positions left the frame.")
+    lost = np.arange(30 + max_lost_frames, 30 + gap - max_delay)
+    if online_track['valid'][lost].any():
+        raise AssertionError(f"Frames more than max_lost_frames={max_lost_frames} into the gap were predicted.")
+    both = online_track['valid'] & offline_track['valid']
+    return np.abs(online_x[both] - get_ball_track_centers(offline_track)[both, 0]).max()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the online ball tracker on synthetic tracks and time its "
+                                                 "per-frame update.")
+    parser.add_argument("--frames", type=int, default=1000, help="Length of the synthetic tracks")
+    args = parser.parse_args()
+
+    for max_delay in (0, 1, 30):
+        seconds = check_distractor(args.frames, max_delay)
+        print(f"Distractor, max_delay={max_delay:<3} tracked the ball, {seconds / args.frames * 1e6:.1f} us/frame")
+    for max_delay in (1, 10, 30):
+        check_short_gaps(max_delay)
+        print(f"Short gaps, max_delay={max_delay:<3} match the offline interpolation")
+    for max_delay, max_lost_frames in ((0, 10), (30, 30)):
+        deviation = check_long_gap(max_delay, max_lost_frames)
+        print(f"200-frame gap, max_delay={max_delay:<3} max_lost_frames={max_lost_frames:<3} stayed in the frame, "
+              f"max {deviation:.0f} px from the offline interpolation")
@@ -0,0 +1,242 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import cv2
+import numpy as np
+import main
+from benchmarks.synthetic_video import BALL_COLOR, generate_synthetic_video
+from court_line_detector import CourtLineDetector
+from pipeline import AnalysisContext
+from process_video import iter_video
+from trackers import DetectionCache, TennisBallTracker
+
+
+class StubBallTracker(TennisBallTracker):
+    # Finds the synthetic ball by its colour, so everything but the model forward pass is exercised
+    def __init__(self, conf=0.15):
+        self.model = None
+        self.model_path = 'stub'
+        self.conf = conf
+        self.roi_crop_size = None
+        self.roi_imgsz = 320
+        self.backend = 'pytorch'
+        self.int8 = False
+        self.input_size = 640
+        self.last_detection_stats = None
+        self.last_decode_stats = None
+
+    def detect_batch(self, frames):
+        boxes = np.full((len(frames), 4), np.nan)
+        confs = np.zeros(len(frames), dtype=np.float32)
+        lower = np.array(BALL_COLOR) - 40
+        upper = np.array(BALL_COLOR) + 40
+        for i, frame in enumerate(frames):
+            points = cv2.findNonZero(cv2.inRange(frame, lower, upper))
+            if points is not None:
+                x, y, w, h = cv2.boundingRect(points)
+                boxes[i] = [x, y, x + w, y + h]
+                confs[i] = 1.0
+        return boxes, confs
+
+
+class StubCourtLineDetector(CourtLineDetector):
+    def __init__(self, court_keypoints):
+        self.court_keypoints = np.asarray(court_keypoints, dtype=np.float32)
+        self.backend = 'pytorch'
+
+    def predict_batch(self, images, batch_size=None):
+        return np.tile(self.court_keypoints, (len(images), 1))
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def time_decode(video_path):
+    start = time.perf_counter()
+    frame_count = sum(1 for _ in iter_video(video_path))
+    return time.perf_counter() - start, frame_count
+
+
+def time_drawing(context):
+    # Draws both output streams without encoding; the decode pass is subtracted by the caller
+    start = time.perf_counter()
+    output_video_frames = main.annotate_video_frames(
+        iter_video(context.video_path), context.tennis_ball_tracker, context.tennis_ball_detections,
+        context.court_line_detector, context.court_keypoints
+    )
+    mini_court_frames = main.generate_mini_court_frames(context.mini_court, context.tennis_ball_mini_court_detections)
+    for _ in zip(output_video_frames, mini_court_frames):
+        pass
+    return time.perf_counter() - start
+
+
+def run_pipeline_once(video_path, models_factory, work_dir):
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    tennis_ball_tracker, court_line_detector = models_factory()
+    context = AnalysisContext(
+        video_name, video_path=video_path, output_dir=os.path.join(work_dir, 'output'),
+        tennis_ball_tracker=tennis_ball_tracker, court_line_detector=court_line_detector,
+        detection_cache=DetectionCache(cache_dir=os.path.join(work_dir, 'cache'))
+    )
+
+    stages = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        context.load_video_metadata()
+        stages['metadata'] = time.perf_counter() - start
+        for stage_name, run_stage in main.PIPELINE_STAGES:
+            start = time.perf_counter()
+            run_stage(context)
+            stages[stage_name] = time.perf_counter() - start
+
+    decode_seconds, _ = time_decode(video_path)
+    stages['decode'] = decode_seconds
+    stages['detection_without_decode'] = max(stages['detection'] - decode_seconds, 0.0)
+    stages['drawing'] = max(time_drawing(context) - decode_seconds, 0.0)
+    stages['encoding'] = sum(stats['encode_seconds'] for stats in context.encoder_stats)
+    return stages, context
+
+
+def run_benchmark(video_path, models_factory, repeats=3):
+    runs = []
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory() as work_dir:
+            stages, context = run_pipeline_once(video_path, models_factory, work_dir)
+            runs.append(stages)
+
+    stage_names = list(runs[0])
+    pipeline_stage_names = ['metadata'] + [name for name, _ in main.PIPELINE_STAGES]
+    median_stages = {name: statistics.median(run[name] for run in runs) for name in stage_names}
+    total_seconds = sum(median_stages[name] for name in pipeline_stage_names)
+    return {
+        'frame_count': context.frame_count,
+        'shot_count': len(context.tennis_ball_shot_frames),
+        'stages': median_stages,
+        'total_seconds': total_seconds,
+        'frames_per_second': context.frame_count / total_seconds,
+    }
+
+
+def run_memory_pass(video_path, models_factory):
+    # A separate run, since tracemalloc slows the pipeline down too much to time it in the same pass
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    tennis_ball_tracker, court_line_detector = models_factory()
+    with tempfile.TemporaryDirectory() as work_dir:
+        context = AnalysisContext(
+            video_name, video_path=video_path, output_dir=os.path.join(work_dir, 'output'),
+            tennis_ball_tracker=tennis_ball_tracker, court_line_detector=court_line_detector,
+            detection_cache=DetectionCache(cache_dir=os.path.join(work_dir, 'cache'))
+        )
+        report_path = os.path.join(work_dir, 'memory.json')
+        with contextlib.redirect_stdout(io.StringIO()):
+            main.main(video_name, context=context, memory_report_path=report_path)
+        with open(report_path) as f:
+            return json.load(f)
+
+
+def print_memory_report(memory_report):
+    mb = 1024 * 1024
+    print(f"{'stage':<26} {'rss peak MB':>12} {'py peak MB':>12}")
+    for stage in memory_report['stages']:
+        if stage['depth'] == 0:
+            print(f"{stage['name']:<26} {stage['rss_peak_bytes'] / mb:>12.1f} {stage['traced_peak_bytes'] / mb:>12.1f}")
+    print(f"Peak RSS {memory_report['peak_rss_bytes'] / mb:.1f} MB")
+
+
+def print_report(result, baseline=None):
+    print(f"{'stage':<26} {'seconds':>10} {'ms/frame':>10}" + (f" {'vs baseline':>12}" if baseline else ""))
+    for stage_name, seconds in result['stages'].items():
+        line = f"{stage_name:<26} {seconds:>10.4f} {seconds * 1000 / result['frame_count']:>10.2f}"
+        if baseline and baseline['stages'].get(stage_name):
+            line += f" {seconds / baseline['stages'][stage_name]:>11.2f}x"
+        print(line)
+    print(f"Total {result['total_seconds']:.2f} s for {result['frame_count']} frames "
+          f"({result['frames_per_second']:.1f} fps), {result['shot_count']} shots")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time every stage of main.main on a synthetic court video.")
+    parser.add_argument("--width", type=int, default=1280, help="Synthetic video width")
+    parser.add_argument("--height", type=int, default=720, help="Synthetic video height")
+    parser.add_argument("--frames", type=int, default=240, help="Synthetic video length in frames")
+    parser.add_argument("--fps", type=int, default=24, help="Synthetic video frame rate")
+    parser.add_argument("--video", default=None, help="Use this video instead of generating one (needs real models)")
+    parser.add_argument("--stub-models", action="store_true",
+                        help="Replace YOLO and the keypoint ResNet with stubs to isolate non-model costs")
+    parser.add_argument("--ball-model", default=None, help="YOLO weights (default: the pipeline's model path)")
+    parser.add_argument("--court-model", default=None, help="Keypoint weights (default: the pipeline's model path)")
+    parser.add_argument("--repeats", type=int, default=3, help="Pipeline runs; the median of each stage is kept")
+    parser.add_argument("--output", default="benchmark_pipeline.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", default=None, help="Earlier JSON results to compare against")
+    parser.add_argument("--memory", action="store_true", help="Add a profiled run with per-stage RSS and Python peaks")
+    parser.add_argument("--memory-ceiling-mb", type=float, default=None,
+                        help="Fail if peak RSS goes over this many MB for the configured resolution and length")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as video_dir:
+        video_path = args.video
+        synthetic = None
+        if video_path is None:
+            video_path = os.path.join(video_dir, 'synthetic_match.mp4')
+            synthetic = generate_synthetic_video(video_path, args.width, args.height, args.frames, args.fps)
+
+        if args.stub_models:
+            if synthetic is None:
+                parser.error("--stub-models needs a generated synthetic video")
+
+            def models_factory():
+                return StubBallTracker(), StubCourtLineDetector(synthetic['court_keypoints'])
+        else:
+            from pipeline.analysis_context import TENNIS_BALL_MODEL_PATH, COURT_KEYPOINTS_MODEL_PATH
+
+            tennis_ball_tracker = TennisBallTracker(model_path=args.ball_model or TENNIS_BALL_MODEL_PATH)
+            court_line_detector = CourtLineDetector(model_path=args.court_model or COURT_KEYPOINTS_MODEL_PATH)
+
+            def models_factory():
+                return tennis_ball_tracker, court_line_detector
+
+        result = run_benchmark(video_path, models_factory, args.repeats)
+        if args.memory or args.memory_ceiling_mb is not None:
+            result['memory'] = run_memory_pass(video_path, models_factory)
+
+    result.update({
+        'commit': get_git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'config': {'width': args.width, 'height': args.height, 'frames': args.frames, 'fps': args.fps,
+                   'video': args.video, 'stub_models': args.stub_models, 'repeats': args.repeats,
+                   'memory_ceiling_mb': args.memory_ceiling_mb},
+    })
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    if 'memory' in result:
+        print_memory_report(result['memory'])
+
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.memory_ceiling_mb is not None:
+        peak_mb = result['memory']['peak_rss_bytes'] / (1024 * 1024)
+        if peak_mb > args.memory_ceiling_mb:
+            raise SystemExit(f"Peak RSS {peak_mb:.1f} MB is over the {args.memory_ceiling_mb:.1f} MB ceiling "
+                             f"for {args.width}x{args.height}, {args.frames} frames")
+        print(f"Peak RSS {peak_mb:.1f} MB is within the {args.memory_ceiling_mb:.1f} MB ceiling")
@@ -0,0 +1,73 @@
+import argparse
+from itertools import islice
+from benchmarks.metrics import center_agreement, time_best
+from process_video import PrefetchDecoder, iter_video
+from trackers import TennisBallTracker
+
+
+def time_serial_detection(tennis_ball_tracker, video_path, frame_count, batch_size):
+    return time_best(lambda: tennis_ball_tracker.detect_frames(islice(iter_video(video_path), frame_count),
+                                                               batch_size=batch_size), repeats=1, warmup=False)
+
+
+def detect_prefetched(tennis_ball_tracker, video_path, frame_count, batch_size):
+    with tennis_ball_tracker.open_detector_frames(video_path) as frames:
+        tennis_ball_track = tennis_ball_tracker.detect_frames(islice(frames, frame_count), batch_size=batch_size)
+        tennis_ball_track['box'] /= frames.scale
+    return tennis_ball_track, frames.get_stats()
+
+
+def time_prefetched_detection(tennis_ball_tracker, video_path, frame_count, batch_size):
+    (tennis_ball_track, stats), seconds = time_best(
+        lambda: detect_prefetched(tennis_ball_tracker, video_path, frame_count, batch_size), repeats=1, warmup=False)
+    return tennis_ball_track, seconds, stats
+
+
+def decode(video_path, frame_count, target_size=None):
+    if target_size is None:
+        return sum(1 for _ in islice(iter_video(video_path), frame_count)), None
+    with PrefetchDecoder(video_path, target_size=target_size) as frames:
+        decoded = sum(1 for _ in islice(frames, frame_count))
+    return decoded, frames.get_stats()
+
+
+def time_decode(video_path, frame_count, target_size=None):
+    (decoded, stats), seconds = time_best(lambda: decode(video_path, frame_count, target_size), repeats=1,
+                                          warmup=False)
+    return decoded, seconds, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare serial full-resolution decode with the prefetching, "
+                                                 "downscaling decoder for detection.")
+    parser.add_argument("--video", required=True, help="Video to decode")
+    parser.add_argument("--model", default="models/best.pt", help="YOLO weights")
+    parser.add_argument("--frames", type=int, default=300, help="Maximum number of frames to use")
+    parser.add_argument("--input-size", type=int, default=640, help="Detector input size for downscaled frames")
+    parser.add_argument("--batch-size", type=int, default=8, help="Detection batch size")
+    parser.add_argument("--tolerance", type=float, default=5.0, help="Max center distance in pixels for agreement")
+    parser.add_argument("--decode-only", action="store_true", help="Skip the detection comparison")
+    args = parser.parse_args()
+
+    print(f"{'decode':<28} {'frames':>7} {'seconds':>9} {'decode s':>9} {'resize s':>9}")
+    decoded, seconds, _ = time_decode(args.video, args.frames)
+    print(f"{'serial full resolution':<28} {decoded:>7} {seconds:>9.3f} {'':>9} {'':>9}")
+    decoded, seconds, stats = time_decode(args.video, args.frames, target_size=100000)
+    print(f"{'prefetch full resolution':<28} {decoded:>7} {seconds:>9.3f} {stats['decode_seconds']:>9.3f} "
+          f"{stats['resize_seconds']:>9.3f}")
+    decoded, seconds, stats = time_decode(args.video, args.frames, target_size=args.input_size)
+    print(f"{f'prefetch at {args.input_size}':<28} {decoded:>7} {seconds:>9.3f} {stats['decode_seconds']:>9.3f} "
+          f"{stats['resize_seconds']:>9.3f}")
+
+    if not args.decode_only:
+        tracker = TennisBallTracker(model_path=args.model, input_size=args.input_size)
+        tracker.detect_frames(islice(iter_video(args.video), 1))
+
+        serial_track, serial_seconds = time_serial_detection(tracker, args.video, args.frames, args.batch_size)
+        prefetch_track, prefetch_seconds, stats = time_prefetched_detection(tracker, args.video, args.frames,
+                                                                            args.batch_size)
+        print(f"{'detection':<28} {'frames/s':>9} {'waited s':>9} {'agreement':>10}")
+        print(f"{'serial full resolution':<28} {len(serial_track) / serial_seconds:>9.2f} {'':>9} {'':>10}")
+        print(f"{f'prefetch at {args.input_size}':<28} {len(prefetch_track) / prefetch_seconds:>9.2f} "
+              f"{stats['consumer_wait_seconds']:>9.3f} "
+              f"{center_agreement(prefetch_track, serial_track, args.tolerance):>10.3f}")
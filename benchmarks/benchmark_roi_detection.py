@@ -0,0 +1,53 @@
+import argparse
+import pickle
+import numpy as np
+from itertools import islice
+from benchmarks.metrics import center_agreement, center_recall, time_best
+from bounding_boxes import as_ball_track
+from process_video import iter_video
+from trackers import TennisBallTracker
+
+
+def load_labels(labels_path):
+    if labels_path.endswith('.npy'):
+        return as_ball_track(np.load(labels_path, allow_pickle=False))
+    with open(labels_path, 'rb') as f:
+        return as_ball_track(pickle.load(f))
+
+
+def run_detection(tennis_ball_tracker, frames):
+    tennis_ball_tracker.detect_frames(frames[:1])
+    return time_best(lambda: tennis_ball_tracker.detect_frames(frames), repeats=1, warmup=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare ROI tracking detection with full-frame detection.")
+    parser.add_argument("--video", required=True, help="Labeled clip to run on")
+    parser.add_argument("--labels", default=None,
+                        help="Ground truth ball track (.npy track or pickle of detections); "
+                             "full-frame detections are used as the reference if omitted")
+    parser.add_argument("--model", default="models/best.pt", help="YOLO weights")
+    parser.add_argument("--frames", type=int, default=300, help="Maximum number of frames to use")
+    parser.add_argument("--crop-size", type=int, default=320, help="ROI crop size in pixels")
+    parser.add_argument("--imgsz", type=int, default=320, help="Inference size for ROI crops")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="Max center distance in pixels for a hit")
+    args = parser.parse_args()
+
+    frames = list(islice(iter_video(args.video), args.frames))
+
+    full_tracker = TennisBallTracker(model_path=args.model)
+    full_track, full_seconds = run_detection(full_tracker, frames)
+
+    roi_tracker = TennisBallTracker(model_path=args.model, roi_crop_size=args.crop_size, roi_imgsz=args.imgsz)
+    roi_track, roi_seconds = run_detection(roi_tracker, frames)
+
+    reference_track = load_labels(args.labels) if args.labels else full_track
+    reference_name = "labels" if args.labels else "full-frame detections"
+
+    print(f"Frames: {len(frames)}, reference: {reference_name}, tolerance: {args.tolerance:.0f} px")
+    print(f"{'mode':<12} {'frames/s':>10} {'recall':>8} {'agreement':>10}")
+    for mode, tennis_ball_track, seconds in (('full-frame', full_track, full_seconds), ('roi', roi_track, roi_seconds)):
+        print(f"{mode:<12} {len(frames) / seconds:>10.2f} "
+              f"{center_recall(tennis_ball_track, reference_track, args.tolerance):>8.3f} "
+              f"{center_agreement(tennis_ball_track, reference_track, args.tolerance):>10.3f}")
+    print(f"ROI stats: {roi_tracker.last_detection_stats}")
@@ -0,0 +1,58 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+ENTRY_MODULES = [
+    "main",
+    "gui",
+    "analysis_of_tennis_ball",
+    "analysis_of_tennis_ball.tennis_ball_analysis",
+    "pipeline.analysis_worker",
+    "trackers",
+    "court_line_detector",
+]
+HEAVY_MODULES = ["torch", "torchvision", "ultralytics", "pandas", "matplotlib.pyplot"]
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module, repeats=5):
+    timings = []
+    loaded = []
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, "-c", IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            return {"module": module, "error": result.stderr.strip().splitlines()[-1]}
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(sample["seconds"])
+        loaded = sample["loaded"]
+    return {"module": module, "median_seconds": statistics.median(timings), "heavy_modules": loaded}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure cold import time of the project entry points.")
+    parser.add_argument("--modules", nargs="+", default=ENTRY_MODULES, help="Modules to import")
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters per module (median is reported)")
+    parser.add_argument("--json", default=None, help="Optional path to write the results as JSON")
+    args = parser.parse_args()
+
+    results = [measure_import(module, args.repeats) for module in args.modules]
+    for result in results:
+        if "error" in result:
+            print(f"{result['module']:<45} failed: {result['error']}")
+        else:
+            heavy = ", ".join(result["heavy_modules"]) or "-"
+            print(f"{result['module']:<45} {result['median_seconds']:>7.3f} s   heavy: {heavy}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,44 @@
+import time
+import numpy as np
+from bounding_boxes import get_ball_track_centers
+
+
+def time_best(function, repeats=3, warmup=True):
+    # Returns the last result and the best of `repeats` timed calls; the warmup call is not timed
+    if warmup:
+        function()
+    result, best_seconds = None, float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        best_seconds = min(best_seconds, time.perf_counter() - start)
+    return result, best_seconds
+
+
+def match_ball_centers(tennis_ball_track, reference_track, tolerance):
+    # A frame matches when both tracks have the ball there and their centers are within tolerance pixels. Tracks
+    # are cut to the shorter one
+    frame_count = min(len(tennis_ball_track), len(reference_track))
+    tennis_ball_track, reference_track = tennis_ball_track[:frame_count], reference_track[:frame_count]
+    both_valid = tennis_ball_track['valid'] & reference_track['valid']
+    matched = np.zeros(frame_count, dtype=bool)
+    matched[both_valid] = np.linalg.norm(get_ball_track_centers(tennis_ball_track)[both_valid]
+                                         - get_ball_track_centers(reference_track)[both_valid], axis=1) <= tolerance
+    return matched, tennis_ball_track['valid'], reference_track['valid']
+
+
+def center_agreement(tennis_ball_track, reference_track, tolerance):
+    # Matched frames out of the frames where either track has the ball, so empty frames do not inflate it
+    matched, valid, reference_valid = match_ball_centers(tennis_ball_track, reference_track, tolerance)
+    either_valid = valid | reference_valid
+    if not either_valid.any():
+        return float('nan')
+    return float(matched.sum() / either_valid.sum())
+
+
+def center_recall(tennis_ball_track, reference_track, tolerance):
+    # Matched frames out of the frames where the reference has the ball
+    matched, _, reference_valid = match_ball_centers(tennis_ball_track, reference_track, tolerance)
+    if not reference_valid.any():
+        return float('nan')
+    return float(matched.sum() / reference_valid.sum())
@@ -0,0 +1,58 @@
+import cv2
+import numpy as np
+from mini_court import MiniCourt
+
+COURT_LINES = [(0, 2), (4, 5), (6, 7), (1, 3), (0, 1), (8, 9), (10, 11), (2, 3), (12, 13)]
+BALL_COLOR = (0, 255, 255)
+BALL_RADIUS = 8
+
+
+def get_court_homography(width, height):
+    # Maps the flat mini court layout onto a broadcast-like trapezoid in the video frame
+    court_keypoints = MiniCourt(None).keypoints.reshape(-1, 2)
+    source = np.float32([court_keypoints[0], court_keypoints[1], court_keypoints[2], court_keypoints[3]])
+    target = np.float32([
+        [width * 0.30, height * 0.15], [width * 0.70, height * 0.15],
+        [width * 0.12, height * 0.92], [width * 0.88, height * 0.92],
+    ])
+    return cv2.getPerspectiveTransform(source, target)
+
+
+def get_synthetic_court_keypoints(width, height):
+    court_keypoints = MiniCourt(None).keypoints.reshape(-1, 1, 2).astype(np.float32)
+    return cv2.perspectiveTransform(court_keypoints, get_court_homography(width, height)).reshape(-1)
+
+
+def get_ball_centers(frame_count, width, height, rally_frames=48, seed=0):
+    # The ball crosses the court between baselines, so every rally_frames it changes vertical direction
+    rng = np.random.default_rng(seed)
+    frames = np.arange(frame_count)
+    phase = (frames % (2 * rally_frames)) / rally_frames
+    progress = np.where(phase <= 1, phase, 2 - phase)
+    y = height * (0.2 + 0.65 * progress)
+    x = width * (0.5 + 0.25 * np.sin(frames / (rally_frames * 0.7))) + rng.normal(0, 2, frame_count)
+    return np.column_stack((x, y))
+
+
+def generate_synthetic_video(output_path, width=1280, height=720, frame_count=240, fps=24, miss_rate=0.1, seed=0):
+    court_keypoints = get_synthetic_court_keypoints(width, height)
+    points = court_keypoints.reshape(-1, 2).astype(np.int32)
+    background = np.full((height, width, 3), (60, 130, 70), dtype=np.uint8)
+    for start, end in COURT_LINES:
+        cv2.line(background, tuple(points[start]), tuple(points[end]), (255, 255, 255), 3)
+
+    ball_centers = get_ball_centers(frame_count, width, height, seed=seed)
+    visible = np.random.default_rng(seed + 1).random(frame_count) >= miss_rate
+    writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    try:
+        for center, is_visible in zip(ball_centers, visible):
+            frame = background.copy()
+            if is_visible:
+                cv2.circle(frame, (int(center[0]), int(center[1])), BALL_RADIUS, BALL_COLOR, -1)
+            writer.write(frame)
+    finally:
+        writer.release()
+
+    ball_boxes = np.column_stack((ball_centers - BALL_RADIUS, ball_centers + BALL_RADIUS))
+    ball_boxes[~visible] = np.nan
+    return {'court_keypoints': court_keypoints, 'ball_boxes': ball_boxes}
@@ -1,2 +1,4 @@
 from .bounding_boxes_utils import (get_center_of_bounding_box, measure_distance, get_foot_position,
                                    get_closest_keypoint_index,get_height_of_bbox,get_center_of_bounding_box)
+from .ball_track import (BALL_TRACK_DTYPE, create_ball_track, is_ball_track, as_ball_track, ball_track_to_detections,
+                         get_ball_track_centers, interpolate_ball_track)
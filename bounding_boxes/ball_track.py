@@ -0,0 +1,60 @@
+import numpy as np
+
+BALL_TRACK_DTYPE = np.dtype([
+    ('frame', np.int32),
+    ('box', np.float64, (4,)),
+    ('conf', np.float32),
+    ('valid', np.bool_),
+])
+
+
+def create_ball_track(frame_count):
+    track = np.zeros(frame_count, dtype=BALL_TRACK_DTYPE)
+    track['frame'] = np.arange(frame_count)
+    track['box'] = np.nan
+    return track
+
+
+def is_ball_track(tennis_ball_positions):
+    return isinstance(tennis_ball_positions, np.ndarray) and tennis_ball_positions.dtype == BALL_TRACK_DTYPE
+
+
+def as_ball_track(tennis_ball_positions):
+    if is_ball_track(tennis_ball_positions):
+        return tennis_ball_positions
+
+    # Legacy list of {1: [x1, y1, x2, y2]} dicts, e.g. from old pickle stubs
+    track = create_ball_track(len(tennis_ball_positions))
+    for i, tennis_ball_dict in enumerate(tennis_ball_positions):
+        bbox = tennis_ball_dict.get(1)
+        if bbox is not None and len(bbox) == 4:
+            track['box'][i] = bbox
+            track['valid'][i] = True
+    return track
+
+
+def ball_track_to_detections(track):
+    return [{1: row['box'].tolist()} if row['valid'] else {} for row in track]
+
+
+def get_ball_track_centers(track):
+    centers = np.full((len(track), 2), np.nan, dtype=np.float64)
+    boxes = track['box'][track['valid']]
+    centers[track['valid'], 0] = (boxes[:, 0] + boxes[:, 2]) / 2
+    centers[track['valid'], 1] = (boxes[:, 1] + boxes[:, 3]) / 2
+    return centers
+
+
+def interpolate_ball_track(track):
+    track = track.copy()
+    valid = track['valid']
+    if valid.all() or not valid.any():
+        return track
+
+    frames = np.arange(len(track))
+    boxes = track['box']
+    for column in range(4):
+        # np.interp holds the edge values, like pandas interpolate().bfill()
+        boxes[:, column] = np.interp(frames, frames[valid], boxes[valid, column])
+    track['valid'] = True
+    return track
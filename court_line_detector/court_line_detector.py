@@ -1,33 +1,78 @@
-import torch
-import torchvision.transforms as transforms
-import torchvision.models as models
 import cv2
+import numpy as np
+from inference_backends import check_backend, export_court_keypoints_model, load_backend_model
+
+
+INPUT_SIZE = 224
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
 
 
 class CourtLineDetector:
-    def __init__(self, model_path):
+    def __init__(self, model_path, backend='pytorch', int8=False, calibration_frames=None, batch_size=16):
+        import torch
+        import torchvision.models as models
+
         self.model = models.resnet50(pretrained=False)
         self.model.fc = torch.nn.Linear(self.model.fc.in_features, 14 * 2)
         self.model.load_state_dict(torch.load(model_path, map_location='cpu'))
+        self.model.eval()
 
-        self.transform = transforms.Compose([
-            transforms.ToPILImage(),
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-        ])
+        self.batch_size = batch_size
+        self._input_buffer = np.empty((batch_size, 3, INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+        self._scale = (1.0 / (255.0 * IMAGENET_STD)).astype(np.float32)
+        self._offset = (IMAGENET_MEAN / IMAGENET_STD).astype(np.float32)
 
-    def predict(self, image):
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        image_tensor = self.transform(image_rgb).unsqueeze(0)
+        check_backend(backend)
+        self.backend = backend
+        self.runtime_model = None
+        if backend != 'pytorch':
+            calibration_inputs = None
+            if int8 and calibration_frames is not None and len(calibration_frames) > 0:
+                calibration_inputs = [self.preprocess_batch([frame])[0].copy() for frame in calibration_frames]
+            exported_path = export_court_keypoints_model(self.model, model_path, backend, int8=int8,
+                                                         calibration_inputs=calibration_inputs)
+            self.runtime_model = load_backend_model(exported_path, backend)
+
+    def preprocess_batch(self, images):
+        # Resize and normalize straight into the reused NCHW buffer; the returned array is a view of it
+        if len(images) > len(self._input_buffer):
+            self._input_buffer = np.empty((len(images), 3, INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+        batch = self._input_buffer[:len(images)]
+        for i, image in enumerate(images):
+            interpolation = cv2.INTER_AREA if min(image.shape[:2]) > INPUT_SIZE else cv2.INTER_LINEAR
+            resized = cv2.resize(image, (INPUT_SIZE, INPUT_SIZE), interpolation=interpolation)
+            rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB).astype(np.float32)
+            batch[i] = (rgb * self._scale - self._offset).transpose(2, 0, 1)
+        return batch
+
+    def _forward(self, batch):
+        import torch
+
+        if self.runtime_model is not None:
+            return np.asarray(self.runtime_model(batch)).reshape(len(batch), -1)
         with torch.no_grad():
-            outputs = self.model(image_tensor)
-        keypoints = outputs.squeeze().cpu().numpy()
-        original_height, original_width = image.shape[:2]
-        keypoints[::2] *= original_width / 224.0
-        keypoints[1::2] *= original_height / 224.0
+            return self.model(torch.from_numpy(batch)).cpu().numpy().reshape(len(batch), -1)
+
+    def predict_batch(self, images, batch_size=None):
+        batch_size = batch_size or self.batch_size
+        keypoints = np.empty((len(images), 14 * 2), dtype=np.float32)
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+            keypoints[start:start + len(chunk)] = self._forward(self.preprocess_batch(chunk))
+
+        sizes = np.array([image.shape[:2] for image in images], dtype=np.float32).reshape(-1, 2)
+        keypoints[:, ::2] *= sizes[:, 1:2] / INPUT_SIZE
+        keypoints[:, 1::2] *= sizes[:, 0:1] / INPUT_SIZE
         return keypoints
 
+    def predict_median(self, images, batch_size=None):
+        # Per-keypoint median over sampled frames, robust to frames where players hide the lines
+        return np.median(self.predict_batch(images, batch_size=batch_size), axis=0)
+
+    def predict(self, image):
+        return self.predict_batch([image])[0]
+
     def draw_keypoints(self, image, keypoints):
         for i in range(0, len(keypoints), 2):
             x = int(keypoints[i])
@@ -3,12 +3,28 @@ from ttkbootstrap.constants import *
 from tkinter import filedialog, messagebox, scrolledtext
 import subprocess
 import os
+import queue
 import sys
-import cv2
 import threading
 from PIL import Image, ImageTk
 import shutil
 import time
+from pipeline.analysis_worker import AnalysisWorker
+from process_video import PlaybackBuffer
+from profiling import parse_progress_line
+
+PLAYBACK_SPEEDS = {"0.25x": 0.25, "0.5x": 0.5, "1x": 1.0, "2x": 2.0, "4x": 4.0}
+PLAYBACK_POLL_MS = 10
+PROGRESS_POLL_MS = 100
+WORKER_SHUTDOWN_TIMEOUT = 3
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    return f"{minutes}m {seconds:02d}s" if minutes else f"{seconds}s"
 
 
 class TennisAnalysisApp:
@@ -19,9 +35,19 @@ class TennisAnalysisApp:
         self.video_name = ""
         self.video_path = ""
 
-        self.output_cap = None
-        self.mini_cap = None
+        self.playback = None
         self.video_loop = None
+        self.seeking = False
+        self.worker = AnalysisWorker()
+        # The direct main.py fallback, kept so closing the window can stop it
+        self.analysis_process = None
+        self.process_lock = threading.Lock()
+        self.closing = False
+        self.progress_events = queue.Queue()
+        self.progress_loop = None
+        self.pipeline_stages = []
+        self.shots_received = 0
+        self.detection_saved_frame = None
 
         self.create_start_menu()
 
@@ -130,6 +156,9 @@ class TennisAnalysisApp:
         self.status_label = ttk.Label(info_frame, text="", style="TLabel")
         self.status_label.pack(anchor="w", pady=5)
 
+        self.progress_bar = ttk.Progressbar(info_frame, maximum=100, bootstyle="success-striped", length=400)
+        self.progress_bar.pack(anchor="w", pady=5)
+
         video_container = ttk.LabelFrame(main_frame, text="Video Analysis", bootstyle="default", padding=10)
         video_container.pack(fill="both", expand=True, pady=10)
 
@@ -157,6 +186,28 @@ class TennisAnalysisApp:
         self.mini_label = ttk.Label(mini_frame, borderwidth=2, relief="groove")
         self.mini_label.grid(row=1, column=0, sticky="nsew", padx=5, pady=5)
 
+        playback_frame = ttk.Frame(video_container)
+        playback_frame.pack(fill="x", pady=(5, 0))
+
+        self.btn_play = ttk.Button(playback_frame, text="Pause", command=self.toggle_playback,
+                                   bootstyle="secondary-outline", width=8)
+        self.btn_play.pack(side="left", padx=5)
+
+        self.seek_var = ttk.DoubleVar(value=0)
+        self.seek_scale = ttk.Scale(playback_frame, from_=0, to=1, variable=self.seek_var)
+        self.seek_scale.pack(side="left", fill="x", expand=True, padx=5)
+        self.seek_scale.bind("<ButtonPress-1>", self.start_seek)
+        self.seek_scale.bind("<ButtonRelease-1>", self.finish_seek)
+
+        self.speed_var = ttk.StringVar(value="1x")
+        speed_box = ttk.Combobox(playback_frame, textvariable=self.speed_var, values=list(PLAYBACK_SPEEDS),
+                                 width=6, state="readonly")
+        speed_box.pack(side="left", padx=5)
+        speed_box.bind("<<ComboboxSelected>>", self.change_speed)
+
+        self.frame_label = ttk.Label(playback_frame, text="", width=14, style="TLabel")
+        self.frame_label.pack(side="left", padx=5)
+
         speed_frame = ttk.LabelFrame(main_frame, text="Shot Analysis", bootstyle="primary", padding=10)
         speed_frame.pack(fill="x", pady=10)
 
@@ -293,47 +344,157 @@ class TennisAnalysisApp:
         self.speed_box.insert('end', f"Running analysis_of_tennis_ball on: {self.video_name}\n\n")
         self.status_label.config(text="Processing... Please wait ⏳")
         self.btn_run.config(state='disabled')
+        # The outputs are rewritten during the run, and playback restarts as soon as the new videos are done
+        self.release_resources()
 
-        thread = threading.Thread(target=self._process_video)
+        self.progress_bar.config(value=0)
+        self.pipeline_stages = []
+        self.shots_received = 0
+        self.detection_saved_frame = None
+        self.progress_events = queue.Queue()
+
+        thread = threading.Thread(target=self._process_video, args=(self.progress_events,))
         thread.start()
+        self.progress_loop = self.root.after(PROGRESS_POLL_MS, self.drain_progress_events)
 
-    def _process_video(self):
+    def _process_video(self, progress_events):
+        # Runs off the Tk thread, so it only queues messages; drain_progress_events renders them
         try:
-            self.speed_box.delete(1.0, 'end')
+            returncode, stdout, stderr = self._run_analysis_job(progress_events.put)
+            progress_events.put({'type': 'job_done', 'returncode': returncode, 'stdout': stdout, 'stderr': stderr})
+        except Exception as e:
+            progress_events.put({'type': 'job_done', 'returncode': None, 'stdout': '', 'stderr': '', 'error': str(e)})
 
-            result = subprocess.run([
-                sys.executable, "main.py", self.video_name
-            ], capture_output=True, text=True)
+    def _run_analysis_job(self, on_progress):
+        try:
+            returncode, stdout = self.worker.submit(self.video_name, on_progress=on_progress)
+            return returncode, stdout, ""
+        except (OSError, EOFError, RuntimeError, TimeoutError) as e:
+            if self.closing:
+                raise
+            print(f"Analysis worker unavailable, running main.py directly: {e}")
+
+        with self.process_lock:
+            if self.closing:
+                raise RuntimeError("The window was closed before the analysis started.")
+            process = self.analysis_process = subprocess.Popen([
+                sys.executable, "main.py", self.video_name, "--progress"
+            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1)
+        stderr = []
+        stderr_reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+        stderr_reader.start()
+
+        stdout = []
+        for line in process.stdout:
+            event = parse_progress_line(line)
+            if event is not None:
+                on_progress(event)
+            else:
+                stdout.append(line)
+        process.wait()
+        stderr_reader.join()
+        self.analysis_process = None
+        return process.returncode, ''.join(stdout), ''.join(stderr)
+
+    def drain_progress_events(self):
+        while True:
+            try:
+                event = self.progress_events.get_nowait()
+            except queue.Empty:
+                break
+            if event['type'] == 'job_done':
+                self.progress_loop = None
+                self.finish_analysis(event)
+                return
+            self.show_progress_event(event)
+        self.progress_loop = self.root.after(PROGRESS_POLL_MS, self.drain_progress_events)
+
+    def show_progress_event(self, event):
+        event_type = event['type']
+        if event_type == 'started':
+            self.pipeline_stages = event['stages']
+            self.status_label.config(text=f"Analyzing {event['frame_count']} frames...", foreground="")
+        elif event_type == 'stage' and event['status'] == 'started':
+            self.status_label.config(text=f"{self.describe_stage(event['stage'])}...")
+            self.set_overall_progress(event['stage'], 0.0)
+        elif event_type == 'frames':
+            done, total = event['frames_done'], event['frames_total']
+            text = f"{self.describe_stage(event['stage'])}: {done}/{total} frames, {event['frames_per_second']:.1f} fps"
+            if event['eta_seconds'] is not None:
+                text += f", about {format_duration(event['eta_seconds'])} left"
+            if event['stage'] == 'detection' and self.detection_saved_frame is not None:
+                text += f" (saved through frame {self.detection_saved_frame})"
+            self.status_label.config(text=text)
+            self.set_overall_progress(event['stage'], done / total if total else 0.0)
+        elif event_type == 'chunk':
+            self.detection_saved_frame = event['end_frame']
+        elif event_type == 'shot':
+            if self.shots_received == 0:
+                self.speed_box.delete(1.0, 'end')
+            self.shots_received += 1
+            self.speed_box.insert('end', f"Shot {event['index']} | Speed: {event['speed_kmh']:.2f} km/h\n")
+            self.speed_box.see('end')
+        elif event_type == 'shot_summary':
+            self.speed_box.insert('end', f"\n=== Shot Stats ===\nNumber of shots: {event['shot_count']}\n")
+            if event['average_speed_kmh'] is not None:
+                self.speed_box.insert('end', f"Average speed: {event['average_speed_kmh']:.2f} km/h\n")
+        elif event_type == 'output':
+            self.show_output(event)
+
+    def describe_stage(self, stage):
+        return stage.replace('_', ' ').capitalize()
+
+    def set_overall_progress(self, stage, fraction):
+        if stage in self.pipeline_stages:
+            stage_index = self.pipeline_stages.index(stage)
+            self.progress_bar.config(value=(stage_index + fraction) * 100 / len(self.pipeline_stages))
+
+    def show_output(self, event):
+        # Both videos are complete before the heatmap and hit analysis run, so playback can start right away
+        if event['kind'] == 'video' and self.playback is None and self.analysis_videos_exist():
+            self.play_both_videos()
+        elif event['kind'] == 'hit_analysis':
+            self.advanced_btn.config(state="normal")
 
-            shot_info = []
+    def analysis_videos_exist(self):
+        output_dir = f"output_videos/{self.video_name}"
+        return (os.path.exists(os.path.join(output_dir, f"{self.video_name}.avi"))
+                and os.path.exists(os.path.join(output_dir, f"mini_court_for_{self.video_name}.avi")))
 
-            for line in result.stdout.splitlines():
+    def finish_analysis(self, result):
+        self.btn_run.config(state='normal')
+        if result.get('error'):
+            self.speed_box.insert('end', f"\nError: {result['error']}")
+            self.status_label.config(text="Error occurred.", foreground="red")
+            return
+
+        if self.shots_received == 0:
+            # No shot events came through (e.g. an older worker), so fall back to reading the printed lines
+            shot_info = []
+            for line in result['stdout'].splitlines():
                 if "Shot" in line and "Speed" in line:
                     shot_info.append(line)
                 elif "=== Shot Stats ===" in line:
                     shot_info.append("\n" + line)
                 elif "Number of shots:" in line or "Average speed:" in line:
                     shot_info.append(line)
+            if shot_info:
+                self.speed_box.delete(1.0, 'end')
+                self.speed_box.insert('end', "\n".join(shot_info))
 
-            self.speed_box.insert('end', "\n".join(shot_info))
+        if result['stderr']:
+            self.status_label.config(text="Warnings during analysis.", foreground="orange")
 
-            if result.stderr:
-                self.status_label.config(text="Warnings during analysis.", foreground="orange")
-
-            if result.returncode != 0:
-                self.status_label.config(text="Analysis failed.", foreground="red")
-                return
+        if result['returncode'] != 0:
+            self.status_label.config(text="Analysis failed.", foreground="red")
+            return
 
-            self.status_label.config(text="Analysis complete.", foreground="green")
-            self.advanced_btn.config(state="normal")
+        self.progress_bar.config(value=100)
+        self.status_label.config(text="Analysis complete.", foreground="green")
+        self.advanced_btn.config(state="normal")
+        if self.playback is None:
             self.play_both_videos()
 
-        except Exception as e:
-            self.speed_box.insert('end', f"\nError: {e}")
-            self.status_label.config(text="Error occurred.", foreground="red")
-        finally:
-            self.btn_run.config(state='normal')
-
     def play_both_videos(self):
         self.release_resources()
 
@@ -344,46 +505,64 @@ class TennisAnalysisApp:
             self.speed_box.insert('end', "Processed videos not found.\n")
             return
 
-        self.output_cap = cv2.VideoCapture(output_path)
-        self.mini_cap = cv2.VideoCapture(mini_path)
-
-        if not self.output_cap.isOpened() or not self.mini_cap.isOpened():
-            self.speed_box.insert('end', "Error opening video files.\n")
-            self.release_resources()
+        try:
+            # Decoding, resizing and colour conversion happen on the buffer's thread; both streams stay in lockstep
+            self.playback = PlaybackBuffer([output_path, mini_path], display_size=(640, 360))
+        except ValueError as e:
+            self.speed_box.insert('end', f"Error opening video files: {e}\n")
             return
 
-        self.show_frames()
+        self.playback.set_speed(PLAYBACK_SPEEDS[self.speed_var.get()])
+        self.seek_scale.configure(to=max(self.playback.frame_count - 1, 1))
+        self.btn_play.config(text="Pause")
+        self.video_loop = self.root.after(0, self.show_frames)
 
     def show_frames(self):
-        if not self.output_cap or not self.mini_cap:
+        if self.playback is None:
             return
 
-        ret1, frame1 = self.output_cap.read()
-        ret2, frame2 = self.mini_cap.read()
-
-        if not ret1:
-            self.output_cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            ret1, frame1 = self.output_cap.read()
-
-        if not ret2:
-            self.mini_cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            ret2, frame2 = self.mini_cap.read()
+        try:
+            frame = self.playback.poll()
+        except Exception as e:
+            self.speed_box.insert('end', f"Playback error: {e}\n")
+            self.release_resources()
+            return
 
-        if ret1:
-            frame1 = cv2.resize(frame1, (640, 360))
-            frame1 = cv2.cvtColor(frame1, cv2.COLOR_BGR2RGB)
-            img1 = ImageTk.PhotoImage(Image.fromarray(frame1))
+        if frame is not None:
+            # PhotoImage has to be built on the Tk thread, so that is the only per-frame work left here
+            frame_index, (output_frame, mini_frame) = frame
+            img1 = ImageTk.PhotoImage(Image.fromarray(output_frame))
             self.output_label.imgtk = img1
             self.output_label.config(image=img1)
 
-        if ret2:
-            frame2 = cv2.resize(frame2, (640, 360))
-            frame2 = cv2.cvtColor(frame2, cv2.COLOR_BGR2RGB)
-            img2 = ImageTk.PhotoImage(Image.fromarray(frame2))
+            img2 = ImageTk.PhotoImage(Image.fromarray(mini_frame))
             self.mini_label.imgtk = img2
             self.mini_label.config(image=img2)
 
-        self.video_loop = self.root.after(40, self.show_frames)
+            if not self.seeking:
+                self.seek_var.set(frame_index)
+            self.frame_label.config(text=f"{frame_index + 1} / {self.playback.frame_count}")
+
+        self.video_loop = self.root.after(PLAYBACK_POLL_MS, self.show_frames)
+
+    def toggle_playback(self):
+        if self.playback is None:
+            return
+        paused = not self.playback.paused
+        self.playback.set_paused(paused)
+        self.btn_play.config(text="Play" if paused else "Pause")
+
+    def start_seek(self, event):
+        self.seeking = True
+
+    def finish_seek(self, event):
+        self.seeking = False
+        if self.playback is not None:
+            self.playback.seek(self.seek_var.get())
+
+    def change_speed(self, event=None):
+        if self.playback is not None:
+            self.playback.set_speed(PLAYBACK_SPEEDS[self.speed_var.get()])
 
     def show_graphics(self):
         if not self.video_name:
@@ -420,15 +599,24 @@ class TennisAnalysisApp:
         label.pack(padx=10, pady=10)
 
     def release_resources(self):
-        if hasattr(self, 'output_cap') and self.output_cap:
-            self.output_cap.release()
-            self.output_cap = None
-        if hasattr(self, 'mini_cap') and self.mini_cap:
-            self.mini_cap.release()
-            self.mini_cap = None
+        if self.video_loop is not None:
+            self.root.after_cancel(self.video_loop)
+            self.video_loop = None
+        if self.playback is not None:
+            self.playback.close()
+            self.playback = None
 
     def on_closing(self):
+        if self.progress_loop is not None:
+            self.root.after_cancel(self.progress_loop)
         self.release_resources()
+        with self.process_lock:
+            self.closing = True
+            process = self.analysis_process
+        if process is not None and process.poll() is None:
+            process.terminate()
+        # Bounded so a worker busy with a job cannot hold the window open; it is terminated after the timeout
+        self.worker.shutdown(timeout=WORKER_SHUTDOWN_TIMEOUT)
         self.root.destroy()
 
 
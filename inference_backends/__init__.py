@@ -0,0 +1,10 @@
+from .backends import (
+    SUPPORTED_BACKENDS,
+    OnnxRuntimeModel,
+    OpenVinoModel,
+    check_backend,
+    export_court_keypoints_model,
+    export_tennis_ball_model,
+    load_backend_model,
+    quantize_onnx_model,
+)
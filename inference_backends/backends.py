@@ -0,0 +1,191 @@
+import contextlib
+import os
+import shutil
+import tempfile
+import cv2
+import numpy as np
+
+SUPPORTED_BACKENDS = ('pytorch', 'onnxruntime', 'openvino')
+
+
+def check_backend(backend):
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {', '.join(SUPPORTED_BACKENDS)}")
+
+
+def is_export_stale(source_path, exported_path):
+    if not os.path.exists(exported_path):
+        return True
+    return os.path.exists(source_path) and os.path.getmtime(source_path) > os.path.getmtime(exported_path)
+
+
+@contextlib.contextmanager
+def _export_dir(exported_path):
+    # Exports are built in a scratch directory next to their destination and moved into place in one step, so an
+    # interrupted or concurrent build never leaves a half-written model where a loader would pick it up
+    tmp_dir = tempfile.mkdtemp(prefix='.export-', dir=os.path.dirname(os.path.abspath(exported_path)))
+    try:
+        yield tmp_dir
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _replace_export(built_path, exported_path):
+    if os.path.isdir(exported_path):
+        shutil.rmtree(exported_path)
+    os.replace(built_path, exported_path)
+
+
+class OnnxRuntimeModel:
+    def __init__(self, onnx_path, intra_op_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch):
+        return self.session.run(None, {self.input_name: np.ascontiguousarray(batch, dtype=np.float32)})[0]
+
+
+class OpenVinoModel:
+    def __init__(self, model_path):
+        import openvino as ov
+
+        self.compiled_model = ov.Core().compile_model(model_path, 'CPU')
+        self.output = self.compiled_model.output(0)
+
+    def __call__(self, batch):
+        return self.compiled_model(np.ascontiguousarray(batch, dtype=np.float32))[self.output]
+
+
+class _CalibrationReader:
+    def __init__(self, input_name, calibration_inputs):
+        self._batches = iter([{input_name: batch[None].astype(np.float32)} for batch in calibration_inputs])
+
+    def get_next(self):
+        return next(self._batches, None)
+
+
+def quantize_onnx_model(onnx_path, output_path, calibration_inputs, op_types_to_quantize=None):
+    import onnxruntime as ort
+    from onnxruntime.quantization import QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    input_name = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+    with _export_dir(output_path) as tmp_dir:
+        preprocessed_path = os.path.join(tmp_dir, 'preprocessed.onnx')
+        quantized_path = os.path.join(tmp_dir, os.path.basename(output_path))
+        quant_pre_process(onnx_path, preprocessed_path, skip_symbolic_shape=True)
+        quantize_static(preprocessed_path, quantized_path, _CalibrationReader(input_name, calibration_inputs),
+                        weight_type=QuantType.QInt8, activation_type=QuantType.QUInt8,
+                        op_types_to_quantize=op_types_to_quantize)
+        _replace_export(quantized_path, output_path)
+    return output_path
+
+
+def export_court_keypoints_model(torch_model, model_path, backend, int8=False, calibration_inputs=None):
+    import torch
+
+    check_backend(backend)
+    base_path = os.path.splitext(model_path)[0]
+    onnx_path = f"{base_path}.onnx"
+    if is_export_stale(model_path, onnx_path):
+        torch_model.eval()
+        with _export_dir(onnx_path) as tmp_dir:
+            built_path = os.path.join(tmp_dir, os.path.basename(onnx_path))
+            torch.onnx.export(torch_model, torch.zeros(1, 3, 224, 224), built_path, input_names=['images'],
+                              output_names=['keypoints'],
+                              dynamic_axes={'images': {0: 'batch'}, 'keypoints': {0: 'batch'}},
+                              opset_version=17, dynamo=False)
+            _replace_export(built_path, onnx_path)
+
+    if not int8:
+        return onnx_path
+
+    int8_path = f"{base_path}_int8.onnx"
+    if not is_export_stale(model_path, int8_path) and not is_export_stale(onnx_path, int8_path):
+        return int8_path
+    if calibration_inputs is None or len(calibration_inputs) == 0:
+        raise ValueError("int8 quantization needs calibration frames.")
+
+    # The QDQ model from static quantization runs as int8 on both ONNX Runtime and OpenVINO
+    return quantize_onnx_model(onnx_path, int8_path, calibration_inputs)
+
+
+def load_backend_model(exported_path, backend):
+    if backend == 'openvino':
+        return OpenVinoModel(exported_path)
+    return OnnxRuntimeModel(exported_path)
+
+
+def letterbox(frame, imgsz=640):
+    height, width = frame.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    resized = cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top = (imgsz - resized.shape[0]) // 2
+    left = (imgsz - resized.shape[1]) // 2
+    canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    return canvas
+
+
+def prepare_yolo_calibration_inputs(frames, imgsz=640):
+    return [cv2.cvtColor(letterbox(frame, imgsz), cv2.COLOR_BGR2RGB).transpose(2, 0, 1).astype(np.float32) / 255.0
+            for frame in frames]
+
+
+def _export_yolo(model_path, exported_path, export_format, imgsz):
+    from ultralytics import YOLO
+
+    if not is_export_stale(model_path, exported_path):
+        return exported_path
+    with _export_dir(exported_path) as tmp_dir:
+        # Ultralytics writes the export next to the weights, so it exports from a copy in the scratch directory
+        source_path = model_path
+        if os.path.isfile(model_path):
+            source_path = shutil.copy2(model_path, tmp_dir)
+        export_path = YOLO(source_path).export(format=export_format, imgsz=imgsz, dynamic=True)
+        _replace_export(export_path, exported_path)
+    return exported_path
+
+
+def export_tennis_ball_model(model_path, backend, int8=False, calibration_frames=None, imgsz=640):
+    check_backend(backend)
+    base_path = os.path.splitext(model_path)[0]
+    if int8 and (calibration_frames is None or len(calibration_frames) == 0):
+        raise ValueError("int8 quantization needs calibration frames.")
+
+    if backend == 'openvino':
+        openvino_dir = _export_yolo(model_path, f"{base_path}_openvino_model", 'openvino', imgsz)
+        if not int8:
+            return openvino_dir
+
+    onnx_path = _export_yolo(model_path, f"{base_path}.onnx", 'onnx', imgsz)
+    if not int8:
+        return onnx_path
+
+    int8_path = f"{base_path}_int8.onnx"
+    if is_export_stale(model_path, int8_path) or is_export_stale(onnx_path, int8_path):
+        # Only the convolutions are quantized; the box decoding head stays in float for accurate coordinates
+        quantize_onnx_model(onnx_path, int8_path, prepare_yolo_calibration_inputs(calibration_frames, imgsz),
+                            op_types_to_quantize=['Conv'])
+    if backend == 'onnxruntime':
+        return int8_path
+
+    # OpenVINO runs the QDQ graph as int8; the fp32 export supplies the metadata Ultralytics expects
+    int8_dir = f"{base_path}_int8_openvino_model"
+    if is_export_stale(int8_path, int8_dir):
+        import openvino as ov
+
+        with _export_dir(int8_dir) as tmp_dir:
+            built_dir = os.path.join(tmp_dir, os.path.basename(int8_dir))
+            os.makedirs(built_dir)
+            ov.save_model(ov.Core().read_model(int8_path),
+                          os.path.join(built_dir, f"{os.path.basename(base_path)}.xml"), compress_to_fp16=False)
+            shutil.copy(os.path.join(openvino_dir, 'metadata.yaml'), built_dir)
+            _replace_export(built_dir, int8_dir)
+    return int8_dir
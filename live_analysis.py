@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+from analysis_of_tennis_ball import HeatmapAccumulator
+from mini_court import MiniCourt
+from process_video import LiveCapture
+from profiling import RollingLatencyStats, trace_span
+from trackers import OnlineBallTracker
+from trackers.online_ball_tracker import rows_to_ball_track
+
+# Analyzer policy -> capture queue policy. 'budget' also skips a queued frame that would finish over the budget
+DROP_POLICIES = {'latest': 'latest', 'budget': 'oldest', 'none': 'none'}
+
+
+class LiveAnalyzer:
+    def __init__(self, tennis_ball_tracker, court_line_detector, latency_budget_ms=100, drop_policy='latest',
+                 max_delay=0, max_lost_seconds=1.0, stats_window=300):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy {drop_policy!r}, expected one of {tuple(DROP_POLICIES)}")
+        self.tennis_ball_tracker = tennis_ball_tracker
+        self.court_line_detector = court_line_detector
+        self.latency_budget = latency_budget_ms / 1000
+        self.drop_policy = drop_policy
+        # max_delay=0 emits every frame as soon as it is detected; a larger delay lets the tracker interpolate gaps
+        # at the cost of that much extra latency
+        self.max_delay = max_delay
+        # Frame indices count dropped frames too, so the lost-track limit is wall time converted at the capture fps
+        self.max_lost_seconds = max_lost_seconds
+        self.stats_window = stats_window
+
+        self.mini_court = MiniCourt(None)
+        self.heatmap = HeatmapAccumulator(self.mini_court)
+        self.stats = None
+        self.court_keypoints = None
+        self.rows = []
+        self.mini_court_positions = []
+
+    def open_capture(self, source, pace=None):
+        return LiveCapture(source, target_size=self.tennis_ball_tracker.input_size,
+                           drop_policy=DROP_POLICIES[self.drop_policy], pace=pace)
+
+    def run(self, capture, max_frames=None, report_every=2.0, on_position=None):
+        self.stats = RollingLatencyStats(self.stats_window, latency_budget=self.latency_budget)
+        self.heatmap.reset()
+        self.rows, self.mini_court_positions = [], []
+        online_tracker = OnlineBallTracker(max_delay=self.max_delay,
+                                           max_lost_frames=max(1, round(self.max_lost_seconds * capture.fps)),
+                                           frame_size=capture.frame_size if all(capture.frame_size) else None)
+        capture_times = {}
+        homography = None
+        last_index = None
+        detect_seconds = 0.0
+        next_report = time.perf_counter() + report_every
+
+        for frame_index, capture_time, frame in capture:
+            if homography is None:
+                # The court is found once on the first frame; the camera is assumed not to move
+                with trace_span('live_court_keypoints'):
+                    self.court_keypoints = self.court_line_detector.predict(frame) / capture.scale
+                    homography = self.mini_court.get_court_homography(self.court_keypoints)
+                last_index = frame_index
+                continue
+
+            if frame_index - last_index > 1:
+                self.stats.record_dropped(frame_index - last_index - 1)
+            last_index = frame_index
+            if max_frames is not None and frame_index > max_frames:
+                break
+
+            if self.drop_policy == 'budget' and capture.pending() and \
+                    time.perf_counter() - capture_time + detect_seconds > self.latency_budget:
+                # This frame would finish over budget and a newer one is already waiting, so skip to it
+                self.stats.record_dropped()
+                continue
+
+            start = time.perf_counter()
+            with trace_span('live_detect', frame=frame_index):
+                candidates = self.tennis_ball_tracker.detect_frame_candidates(frame)
+            detect_seconds = 0.8 * detect_seconds + 0.2 * (time.perf_counter() - start)
+            candidates[:, :4] /= capture.scale
+            capture_times[frame_index] = capture_time
+            for row in online_tracker.update(frame_index, candidates):
+                self._emit(row, capture_times.pop(row[0]), homography, on_position)
+
+            if report_every and time.perf_counter() >= next_report:
+                print(self.stats.format_snapshot())
+                next_report = time.perf_counter() + report_every
+
+        for row in online_tracker.flush():
+            self._emit(row, capture_times.pop(row[0]), homography, on_position)
+        return self.get_result(capture)
+
+    def _emit(self, row, capture_time, homography, on_position):
+        frame_index, box, conf, valid = row
+        position = (np.nan, np.nan)
+        if valid:
+            center = np.array([[(box[0] + box[2]) / 2, (box[1] + box[3]) / 2]])
+            position = tuple(self.mini_court.project_points(center, homography)[0])
+            self.heatmap.add_point(*position)
+        self.rows.append(row)
+        self.mini_court_positions.append(position)
+        self.stats.record_processed(time.perf_counter() - capture_time)
+        if on_position is not None:
+            on_position(frame_index, box, valid, position)
+
+    def get_result(self, capture):
+        return {
+            'latency_budget_ms': self.latency_budget * 1000,
+            'drop_policy': self.drop_policy,
+            'max_delay': self.max_delay,
+            'max_lost_seconds': self.max_lost_seconds,
+            'capture': capture.get_stats(),
+            'stats': self.stats.snapshot(),
+        }
+
+    def get_ball_track(self):
+        return rows_to_ball_track(self.rows)
+
+
+def parse_source(source):
+    return int(source) if source.isdigit() else source
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Track the ball live from a camera or a video file paced at its "
+                                                 "native frame rate.")
+    parser.add_argument("source", help="Camera index or video file")
+    parser.add_argument("--name", default=None, help="Name for the outputs (default: the file name or camera_<n>)")
+    parser.add_argument("--output-dir", default=None, help="Where to write the heatmap and stats "
+                                                            "(default: output_videos/<name>)")
+    parser.add_argument("--ball-model", default=None, help="YOLO weights (default: the pipeline's model path)")
+    parser.add_argument("--court-model", default=None, help="Keypoint weights (default: the pipeline's model path)")
+    parser.add_argument("--backend", default="pytorch", help="Ball detector inference backend")
+    parser.add_argument("--input-size", type=int, default=640, help="Frames are downscaled to this for detection")
+    parser.add_argument("--latency-budget-ms", type=float, default=100, help="End-to-end latency target per frame")
+    parser.add_argument("--drop-policy", choices=tuple(DROP_POLICIES), default="latest",
+                        help="latest: always detect the newest frame; budget: queue frames but skip those that would "
+                             "finish over the budget; none: never drop")
+    parser.add_argument("--max-delay", type=int, default=0,
+                        help="Frames the tracker may hold back to interpolate gaps (adds latency)")
+    parser.add_argument("--max-lost-seconds", type=float, default=1.0,
+                        help="How long an unseen ball keeps its track before the tracker starts over")
+    parser.add_argument("--no-pace", action="store_true", help="Read files as fast as possible instead of at their fps")
+    parser.add_argument("--max-frames", type=int, default=None, help="Stop after this many frames")
+    parser.add_argument("--report-every", type=float, default=2.0, help="Seconds between rolling stats lines")
+    args = parser.parse_args()
+
+    from court_line_detector import CourtLineDetector
+    from pipeline.analysis_context import TENNIS_BALL_MODEL_PATH, COURT_KEYPOINTS_MODEL_PATH
+    from trackers import TennisBallTracker
+
+    source = parse_source(args.source)
+    name = args.name or (f"camera_{source}" if isinstance(source, int)
+                         else os.path.splitext(os.path.basename(source))[0])
+    output_dir = args.output_dir or f"output_videos/{name}"
+
+    analyzer = LiveAnalyzer(
+        TennisBallTracker(model_path=args.ball_model or TENNIS_BALL_MODEL_PATH, backend=args.backend,
+                          input_size=args.input_size),
+        CourtLineDetector(model_path=args.court_model or COURT_KEYPOINTS_MODEL_PATH),
+        latency_budget_ms=args.latency_budget_ms, drop_policy=args.drop_policy, max_delay=args.max_delay,
+        max_lost_seconds=args.max_lost_seconds,
+    )
+    with analyzer.open_capture(source, pace=False if args.no_pace else None) as capture:
+        try:
+            result = analyzer.run(capture, max_frames=args.max_frames, report_every=args.report_every)
+        except KeyboardInterrupt:
+            result = analyzer.get_result(capture)
+
+    print(f"Final: {analyzer.stats.format_snapshot(result['stats'])}")
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"Heatmap saved to {analyzer.heatmap.save(os.path.join(output_dir, f'heatmap_for_{name}.png'))}")
+    stats_path = os.path.join(output_dir, 'live_stats.json')
+    with open(stats_path, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Stats written to {stats_path}")
@@ -1,90 +1,216 @@
+import argparse
 import os
+import time
 import cv2
 import numpy as np
 import constants
-from process_video import read_video, save_video
-from court_line_detector import CourtLineDetector
+from process_video import PrefetchDecoder, sample_frames, save_videos_async
 from mini_court import MiniCourt
-from trackers import TennisBallTracker
+from pipeline import AnalysisContext
+from profiling import (MemoryProfiler, enable_tracing, disable_tracing, trace_span, enable_progress, disable_progress,
+                       progress_stage, report_event, report_frames, format_progress_line)
 from bounding_boxes import measure_distance
 from utils import convert_pixel_distance_to_meters
 from analysis_of_tennis_ball import create_heatmap, detect_ball_hits
 
 
-def main(video_path):
-    input_video_path = f"input_videos/{video_path}.mp4"
-    video_frames = read_video(input_video_path)
+def annotate_video_frames(video_frames, tennis_ball_tracker, tennis_ball_detections,
+                          court_line_detector, court_keypoints):
+    for i, (frame, tennis_ball_row) in enumerate(zip(video_frames, tennis_ball_detections)):
+        frame = tennis_ball_tracker.draw_bounding_box(frame, tennis_ball_row)
+        frame = court_line_detector.draw_keypoints(frame, court_keypoints)
+        cv2.putText(frame, f"Frame: {i}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        report_frames('render_videos')
+        yield frame
+
+
+def generate_mini_court_frames(mini_court, tennis_ball_mini_court_detections):
+    for i, frame in enumerate(mini_court.iter_mini_court_frames(tennis_ball_mini_court_detections)):
+        cv2.putText(frame, f"Frame: {i}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
+        yield frame
+
 
-    tennis_ball_tracker = TennisBallTracker(
-        model_path="D:/tennis_thesis/runs/train/tennis_ball_yolov5m/weights/best.pt"
+def detect_tennis_ball(context):
+    tennis_ball_tracker = context.tennis_ball_tracker
+    context.raw_tennis_ball_detections = tennis_ball_tracker.detect_video(
+        context.video_path, cache=context.detection_cache
     )
-    stub_path = f"tracker_stub/tennis_ball_detections_for_{video_path}.pkl"
-    read_from_stub = os.path.exists(stub_path)
-    tennis_ball_detections = tennis_ball_tracker.detect_frames(
-        video_frames, read_from_stub=read_from_stub, stub_path=stub_path
+    decode_stats = tennis_ball_tracker.last_decode_stats
+    if decode_stats is None:
+        print("Reused cached ball detections")
+    else:
+        print(f"Decoded {decode_stats['frames_decoded']} frames for detection at scale {decode_stats['scale']:.2f}: "
+              f"{decode_stats['decode_seconds']:.2f} s decode, {decode_stats['resize_seconds']:.2f} s resize, "
+              f"detector waited {decode_stats['consumer_wait_seconds']:.2f} s")
+
+
+def interpolate_tennis_ball(context):
+    context.tennis_ball_detections = context.tennis_ball_tracker.interpolate_tennis_ball_positions(
+        context.raw_tennis_ball_detections
     )
-    tennis_ball_detections = tennis_ball_tracker.interpolate_tennis_ball_positions(tennis_ball_detections)
 
-    court_line_detector = CourtLineDetector(model_path="models/tennis_court_keypoints_model.pth")
-    court_keypoints = court_line_detector.predict(video_frames[0])
 
-    mini_court = MiniCourt(video_frames[0])
-    tennis_ball_shot_frames = tennis_ball_tracker.get_tennis_ball_shot_frames(tennis_ball_detections)
-    tennis_ball_mini_court_detections = mini_court.convert_bounding_boxes_to_mini_court_coordinates(
-        tennis_ball_detections, court_keypoints
+def detect_court_keypoints(context):
+    court_line_detector = context.court_line_detector
+    if context.court_keypoint_frames > 1:
+        court_frames = sample_frames(context.video_path, context.court_keypoint_frames)
+        context.court_keypoints = court_line_detector.predict_median(court_frames)
+    else:
+        context.court_keypoints = court_line_detector.predict(context.first_frame)
+
+
+def detect_shots(context):
+    context.tennis_ball_shot_frames = context.tennis_ball_tracker.get_tennis_ball_shot_frames(
+        context.tennis_ball_detections
     )
 
+
+def project_tennis_ball_to_mini_court(context):
+    context.mini_court = MiniCourt(context.first_frame)
+    context.tennis_ball_mini_court_detections = context.project_to_mini_court(context.tennis_ball_detections)
+
+
+def compute_shot_speeds(context):
+    tennis_ball_shot_frames = context.tennis_ball_shot_frames
+    tennis_ball_mini_court_detections = context.tennis_ball_mini_court_detections
     shot_speeds = []
     for i in range(len(tennis_ball_shot_frames) - 1):
         start_frame = tennis_ball_shot_frames[i]
         end_frame = tennis_ball_shot_frames[i + 1]
         shot_time = (end_frame - start_frame) / 24
 
-        start_pos = tennis_ball_mini_court_detections[start_frame].get(1)
-        end_pos = tennis_ball_mini_court_detections[end_frame].get(1)
+        start_pos = tennis_ball_mini_court_detections[start_frame]
+        end_pos = tennis_ball_mini_court_detections[end_frame]
 
-        if start_pos is None or end_pos is None:
+        if np.isnan(start_pos).any() or np.isnan(end_pos).any():
             continue
 
         pixel_distance = measure_distance(start_pos, end_pos)
         meter_distance = convert_pixel_distance_to_meters(
             pixel_distance,
             constants.DOUBLE_LINE_WIDTH,
-            mini_court.get_width_of_mini_court()
+            context.mini_court.get_width_of_mini_court()
         )
         speed_kmh = meter_distance / shot_time * 3.6
         shot_speeds.append(speed_kmh)
 
         print(f"Shot {i + 1} | Speed: {speed_kmh:.2f} km/h")
+        report_event('shot', index=i + 1, start_frame=int(start_frame), end_frame=int(end_frame),
+                     speed_kmh=float(speed_kmh))
 
+    avg_speed = None
     if shot_speeds:
         avg_speed = sum(shot_speeds) / len(shot_speeds)
         print(f"Average speed: {avg_speed:.2f} km/h")
+    report_event('shot_summary', shot_frames=[int(frame) for frame in tennis_ball_shot_frames],
+                 shot_count=len(shot_speeds), average_speed_kmh=None if avg_speed is None else float(avg_speed))
+    context.shot_speeds = shot_speeds
 
-    output_video_frames = tennis_ball_tracker.draw_bounding_boxes(video_frames, tennis_ball_detections)
-    output_video_frames = court_line_detector.draw_keypoints_on_video(output_video_frames, court_keypoints)
-
-    blank_frames = [np.ones((600, 600, 3), dtype=np.uint8) * 255 for _ in video_frames]
-    mini_court_frames = mini_court.draw_mini_court(blank_frames)
-    mini_court_frames = mini_court.draw_points_on_mini_court(mini_court_frames, tennis_ball_mini_court_detections)
-
-    for i, frame in enumerate(mini_court_frames):
-        cv2.putText(frame, f"Frame: {i}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
-    for i, frame in enumerate(output_video_frames):
-        cv2.putText(frame, f"Frame: {i}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
 
-    output_dir = f"output_videos/{video_path}"
+def render_videos(context):
+    output_dir = context.output_dir
+    video_name = context.video_name
     os.makedirs(output_dir, exist_ok=True)
-    save_video(output_video_frames, f"{output_dir}/{video_path}.avi")
-    save_video(mini_court_frames, f"{output_dir}/mini_court_for_{video_path}.avi")
-
-    create_heatmap(video_name=video_path, output_dir=output_dir)
-    hits = detect_ball_hits(video_name=video_path)
+    # Overlays are the only step that needs full resolution frames
+    with PrefetchDecoder(context.video_path) as video_frames:
+        output_video_frames = annotate_video_frames(
+            video_frames, context.tennis_ball_tracker, context.tennis_ball_detections,
+            context.court_line_detector, context.court_keypoints
+        )
+        mini_court_frames = generate_mini_court_frames(context.mini_court, context.tennis_ball_mini_court_detections)
+        context.encoder_stats = save_videos_async({
+            f"{output_dir}/{video_name}.avi": output_video_frames,
+            f"{output_dir}/mini_court_for_{video_name}.avi": mini_court_frames,
+        })
+    for stats in context.encoder_stats:
+        print(f"Saved {stats['output_path']}: {stats['frames_written']} frames at "
+              f"{stats['frames_per_second']:.1f} fps (waited {stats['producer_wait_seconds']:.2f} s on the encoder)")
+        report_event('output', kind='video', path=stats['output_path'])
+
+
+def report_outputs(kind, paths):
+    # The heatmap and hit analysis log their own failures, so only files that were actually written are reported
+    for path in paths:
+        if os.path.exists(path):
+            report_event('output', kind=kind, path=path)
+
+
+def render_heatmap(context):
+    create_heatmap(video_name=context.video_name, output_dir=context.output_dir, context=context)
+    report_outputs('heatmap', [os.path.join(context.output_dir, f'heatmap_for_{context.video_name}.png')])
+
+
+def analyze_hits(context):
+    detect_ball_hits(video_name=context.video_name, context=context)
+    report_outputs('hit_analysis', [os.path.join(context.output_dir, name) for name in (
+        'smoothed_vertical_movement.png', 'delta_y_between_frames.png', 'detected_hits.txt'
+    )])
+
+
+PIPELINE_STAGES = [
+    ('detection', detect_tennis_ball),
+    ('interpolation', interpolate_tennis_ball),
+    ('court_keypoints', detect_court_keypoints),
+    ('shot_detection', detect_shots),
+    ('mini_court_projection', project_tennis_ball_to_mini_court),
+    ('shot_speeds', compute_shot_speeds),
+    ('render_videos', render_videos),
+    ('heatmap', render_heatmap),
+    ('hit_analysis', analyze_hits),
+]
+
+# Stages that go through every frame and report frame counts, throughput and ETA while they run
+FRAME_PROGRESS_STAGES = ('detection', 'render_videos')
+
+
+def main(video_name, context=None, trace_path=None, memory_report_path=None, progress_listener=None):
+    tracer = enable_tracing() if trace_path or memory_report_path else None
+    memory_profiler = MemoryProfiler().start(tracer) if memory_report_path else None
+    if progress_listener is not None:
+        enable_progress(progress_listener)
+    started = time.perf_counter()
+    try:
+        if context is None:
+            context = AnalysisContext(video_name)
+        with trace_span('metadata'):
+            context.load_video_metadata()
+        report_event('started', video_name=video_name, frame_count=context.frame_count, fps=context.fps,
+                     stages=[stage_name for stage_name, _ in PIPELINE_STAGES])
+
+        for stage_name, run_stage in PIPELINE_STAGES:
+            total_frames = context.frame_count if stage_name in FRAME_PROGRESS_STAGES else None
+            with trace_span(stage_name), progress_stage(stage_name, total_frames=total_frames):
+                run_stage(context)
+        report_event('finished', video_name=video_name, seconds=time.perf_counter() - started)
+    finally:
+        if progress_listener is not None:
+            disable_progress()
+        if memory_profiler is not None:
+            memory_profiler.stop()
+            memory_profiler.write_report(memory_report_path)
+            memory_profiler.print_report()
+            print(f"Memory report written to {memory_report_path}")
+        if tracer is not None:
+            disable_tracing()
+        if trace_path:
+            tracer.write_chrome_trace(trace_path)
+            tracer.print_summary()
+            print(f"Trace written to {trace_path}")
+    return context
 
 
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) < 2:
-        print("Usage: python main.py <video_name>")
-    else:
-        main(sys.argv[1])
+    parser = argparse.ArgumentParser(description="Analyze a match video from input_videos/<video_name>.mp4.")
+    parser.add_argument("video_name", help="Video name without extension")
+    parser.add_argument("--trace", default=None, metavar="PATH",
+                        help="Write a Chrome/Perfetto trace of the pipeline stages to PATH")
+    parser.add_argument("--memory", default=None, metavar="PATH",
+                        help="Record RSS and tracemalloc peaks per stage and write the report to PATH")
+    parser.add_argument("--progress", action="store_true",
+                        help="Print structured progress events as '[PROGRESS] {json}' lines for a parent process")
+    args = parser.parse_args()
+    progress_listener = None
+    if args.progress:
+        def progress_listener(event):
+            print(format_progress_line(event), flush=True)
+    main(args.video_name, trace_path=args.trace, memory_report_path=args.memory, progress_listener=progress_listener)
@@ -1,7 +1,7 @@
 import cv2
 import numpy as np
 import constants
-from bounding_boxes.bounding_boxes_utils import get_center_of_bounding_box
+from bounding_boxes.ball_track import as_ball_track, get_ball_track_centers
 from utils import convert_meters_to_pixel_distance
 
 
@@ -17,6 +17,8 @@ class MiniCourt:
             (0, 2), (4, 5), (6, 7), (1, 3),
             (0, 1), (8, 9), (10, 11), (2, 3)
         ]
+        self._homography_cache = None
+        self._court_layer = None
 
     def setup_canvas(self, frame_width, frame_height):
         self.start_x = (frame_width - self.drawing_rectangle_width) // 2
@@ -64,6 +66,17 @@ class MiniCourt:
 
         self.keypoints = k
 
+    def get_court_layer(self, width=600, height=600):
+        if self._court_layer is None or self._court_layer.shape[:2] != (height, width):
+            blank_frame = np.full((height, width, 3), 255, dtype=np.uint8)
+            self._court_layer = self._draw_court_on_frame(blank_frame)
+        return self._court_layer
+
+    def iter_mini_court_frames(self, positions, color=(0, 255, 0)):
+        court_layer = self.get_court_layer()
+        for position in positions:
+            yield self.draw_points_on_frame(court_layer.copy(), position, color)
+
     def draw_mini_court(self, frames):
         return [self._draw_court_on_frame(frame) for frame in frames]
 
@@ -104,38 +117,43 @@ class MiniCourt:
     def draw_points_on_mini_court(self, frames, positions, color=(0, 255, 0)):
         result = frames.copy()
         for i, frame in enumerate(result):
-            for _, (x, y) in positions[i].items():
-                if not (np.isnan(x) or np.isnan(y)):
-                    cv2.circle(frame, (int(x), int(y)), 5, color, -1)
+            self.draw_points_on_frame(frame, positions[i], color)
         return result
 
-    def convert_bounding_boxes_to_mini_court_coordinates(self, ball_boxes, original_court_keypoints):
-        real_x1 = original_court_keypoints[0]
-        real_x2 = original_court_keypoints[2]
-        real_y1 = original_court_keypoints[1]
-        real_y2 = original_court_keypoints[5]
-
-        real_width = abs(real_x2 - real_x1)
-        real_height = abs(real_y2 - real_y1)
-
-        output = []
-        for ball_box_dict in ball_boxes:
-            ball_box = ball_box_dict.get(1)
-            if ball_box is None or len(ball_box) != 4:
-                output.append({})
-                continue
-
-            ball_x, ball_y = get_center_of_bounding_box(ball_box)
-
-            norm_x = (ball_x - real_x1) / real_width if real_width else 0
-            norm_y = (ball_y - real_y1) / real_height if real_height else 0
-
-            mini_x = self.court_start_x + norm_x * self.court_drawing_width
-            mini_y = self.court_start_y + norm_y * self.court_drawing_height
-
-            output.append({1: (mini_x, mini_y)})
+    def draw_points_on_frame(self, frame, position, color=(0, 255, 0)):
+        x, y = position
+        if not (np.isnan(x) or np.isnan(y)):
+            cv2.circle(frame, (int(x), int(y)), 5, color, -1)
+        return frame
 
+    def get_court_homography(self, original_court_keypoints):
+        original_court_keypoints = np.asarray(original_court_keypoints, dtype=np.float64)
+        cache_key = original_court_keypoints.tobytes()
+        if self._homography_cache is not None and self._homography_cache[0] == cache_key:
+            return self._homography_cache[1]
+
+        src_points = original_court_keypoints.reshape(-1, 2)
+        dst_points = self.keypoints.astype(np.float64).reshape(-1, 2)
+        homography, _ = cv2.findHomography(src_points, dst_points)
+        if homography is None:
+            raise ValueError("Could not fit a court homography from the detected keypoints.")
+
+        self._homography_cache = (cache_key, homography)
+        return homography
+
+    def project_points(self, points, homography):
+        points = np.asarray(points, dtype=np.float64)
+        output = np.full_like(points, np.nan)
+        valid = ~np.isnan(points).any(axis=1)
+        if valid.any():
+            projected = cv2.perspectiveTransform(points[valid].reshape(-1, 1, 2), homography)
+            output[valid] = projected.reshape(-1, 2)
         return output
 
+    def convert_bounding_boxes_to_mini_court_coordinates(self, ball_boxes, original_court_keypoints):
+        homography = self.get_court_homography(original_court_keypoints)
+        centers = get_ball_track_centers(as_ball_track(ball_boxes))
+        return self.project_points(centers, homography)
+
     def get_width_of_mini_court(self):
         return self.court_drawing_width
\ No newline at end of file
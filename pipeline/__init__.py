@@ -0,0 +1 @@
+from .analysis_context import AnalysisContext
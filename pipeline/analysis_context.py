@@ -0,0 +1,94 @@
+import os
+import pickle
+import cv2
+
+TENNIS_BALL_MODEL_PATH = "D:/tennis_thesis/runs/train/tennis_ball_yolov5m/weights/best.pt"
+COURT_KEYPOINTS_MODEL_PATH = "models/tennis_court_keypoints_model.pth"
+
+
+def load_tennis_ball_detections(video_name, video_path=None, detection_cache=None):
+    # For the standalone tools: the detections main.py cached for this video with the default tracker settings, or
+    # the legacy pickle stub if there are none
+    from trackers import DetectionCache
+    from trackers.tennis_ball_tracker import get_detection_params
+
+    video_path = video_path or f"input_videos/{video_name}.mp4"
+    if os.path.exists(video_path):
+        detection_cache = detection_cache or DetectionCache()
+        cache_key = detection_cache.make_key(video_path, TENNIS_BALL_MODEL_PATH, get_detection_params())
+        tennis_ball_detections = detection_cache.load(cache_key)
+        if tennis_ball_detections is not None:
+            return tennis_ball_detections
+
+    stub_path = f"tracker_stub/tennis_ball_detections_for_{video_name}.pkl"
+    if not os.path.exists(stub_path):
+        raise FileNotFoundError(f"No cached detections for {video_path} and no stub at {stub_path}; "
+                                f"run main.py on the video first")
+    with open(stub_path, 'rb') as f:
+        return pickle.load(f)
+
+
+class AnalysisContext:
+    def __init__(self, video_name, video_path=None, output_dir=None, tennis_ball_tracker=None,
+                 court_line_detector=None, detection_cache=None, court_keypoint_frames=8):
+        self.video_name = video_name
+        self.video_path = video_path or f"input_videos/{video_name}.mp4"
+        self.output_dir = output_dir or f"output_videos/{video_name}"
+        self._tennis_ball_tracker = tennis_ball_tracker
+        self._court_line_detector = court_line_detector
+        self._detection_cache = detection_cache
+        self.court_keypoint_frames = court_keypoint_frames
+
+        self.fps = None
+        self.frame_count = None
+        self.frame_width = None
+        self.frame_height = None
+        self.first_frame = None
+
+        self.raw_tennis_ball_detections = None
+        self.tennis_ball_detections = None
+        self.tennis_ball_shot_frames = None
+        self.court_keypoints = None
+        self.mini_court = None
+        self.tennis_ball_mini_court_detections = None
+        self.shot_speeds = None
+        self.encoder_stats = None
+
+    @property
+    def tennis_ball_tracker(self):
+        if self._tennis_ball_tracker is None:
+            from trackers import TennisBallTracker
+            self._tennis_ball_tracker = TennisBallTracker(model_path=TENNIS_BALL_MODEL_PATH)
+        return self._tennis_ball_tracker
+
+    @property
+    def court_line_detector(self):
+        if self._court_line_detector is None:
+            from court_line_detector import CourtLineDetector
+            self._court_line_detector = CourtLineDetector(model_path=COURT_KEYPOINTS_MODEL_PATH)
+        return self._court_line_detector
+
+    @property
+    def detection_cache(self):
+        if self._detection_cache is None:
+            from trackers import DetectionCache
+            self._detection_cache = DetectionCache()
+        return self._detection_cache
+
+    def load_video_metadata(self):
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            ret, frame = cap.read()
+            if not ret:
+                raise ValueError(f"Could not read a frame from {self.video_path}")
+            self.fps = cap.get(cv2.CAP_PROP_FPS)
+            self.frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.frame_height, self.frame_width = frame.shape[:2]
+            self.first_frame = frame
+        finally:
+            cap.release()
+
+    def project_to_mini_court(self, tennis_ball_positions):
+        return self.mini_court.convert_bounding_boxes_to_mini_court_coordinates(
+            tennis_ball_positions, self.court_keypoints
+        )
@@ -0,0 +1,221 @@
+import contextlib
+import io
+import os
+import secrets
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client, arbitrary_address
+
+WORKER_ADDRESS_ENV = 'TENNIS_ANALYSIS_WORKER_ADDRESS'
+WORKER_AUTHKEY_ENV = 'TENNIS_ANALYSIS_WORKER_AUTHKEY'
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _ConnectionOutput(io.TextIOBase):
+    def __init__(self, conn):
+        self.conn = conn
+        self.disconnected = False
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        if text:
+            self.send({'type': 'output', 'text': text})
+        return len(text)
+
+    def send(self, message):
+        # Output and progress events share the connection, so whole messages are sent one at a time
+        with self._lock:
+            try:
+                self.conn.send(message)
+            except (OSError, EOFError):
+                self.disconnected = True
+                raise
+
+    def send_progress(self, event):
+        self.send({'type': 'progress', 'event': event})
+
+
+def is_safe_video_name(video_name):
+    # The name is joined into the input and output paths, so it has to be a plain file name
+    return (isinstance(video_name, str) and bool(video_name.strip('.')) and '\x00' not in video_name
+            and '/' not in video_name and '\\' not in video_name and os.path.basename(video_name) == video_name)
+
+
+def serve(address=None, authkey=None):
+    # Connections unpickle what they receive, so the worker only listens on the private address and key it was
+    # started with
+    address = address or os.environ.get(WORKER_ADDRESS_ENV)
+    authkey = authkey or bytes.fromhex(os.environ.get(WORKER_AUTHKEY_ENV, ''))
+    if not address or not authkey:
+        raise SystemExit(f"{WORKER_ADDRESS_ENV} and {WORKER_AUTHKEY_ENV} must be set; the worker is started by "
+                         f"AnalysisWorker.start()")
+
+    import main
+    from court_line_detector import CourtLineDetector
+    from pipeline.analysis_context import AnalysisContext, TENNIS_BALL_MODEL_PATH, COURT_KEYPOINTS_MODEL_PATH
+    from trackers import TennisBallTracker, DetectionCache
+
+    # Models are loaded once; every job reuses them through its AnalysisContext
+    tennis_ball_tracker = TennisBallTracker(model_path=TENNIS_BALL_MODEL_PATH)
+    court_line_detector = CourtLineDetector(model_path=COURT_KEYPOINTS_MODEL_PATH)
+    detection_cache = DetectionCache()
+
+    with Listener(address, authkey=authkey) as listener:
+        print(f"Analysis worker listening on {listener.address}", flush=True)
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                # A client with the wrong key, or one that hung up during the handshake
+                continue
+            with conn:
+                try:
+                    request = conn.recv()
+                    if request.get('type') == 'shutdown':
+                        conn.send({'type': 'done', 'returncode': 0})
+                        return
+                    if request.get('type') == 'ping':
+                        conn.send({'type': 'done', 'returncode': 0})
+                        continue
+
+                    video_name = request.get('video_name')
+                    if not is_safe_video_name(video_name):
+                        conn.send({'type': 'output', 'text': f"Refusing to analyze {video_name!r}: not a plain video "
+                                                             f"name\n"})
+                        conn.send({'type': 'done', 'returncode': 2})
+                        continue
+
+                    context = AnalysisContext(
+                        video_name,
+                        tennis_ball_tracker=tennis_ball_tracker,
+                        court_line_detector=court_line_detector,
+                        detection_cache=detection_cache
+                    )
+                    returncode = 0
+                    output = _ConnectionOutput(conn)
+                    try:
+                        with contextlib.redirect_stdout(output):
+                            main.main(video_name, context=context, progress_listener=output.send_progress)
+                    except Exception:
+                        if output.disconnected:
+                            continue
+                        returncode = 1
+                        conn.send({'type': 'output', 'text': traceback.format_exc()})
+                    conn.send({'type': 'done', 'returncode': returncode})
+                except (OSError, EOFError):
+                    # The client went away; the worker stays up for the next one
+                    continue
+
+
+def new_worker_address():
+    if sys.platform == 'win32':
+        return arbitrary_address('AF_PIPE')
+    # mkdtemp creates the directory as 0700, so only this user can reach the socket
+    return os.path.join(tempfile.mkdtemp(prefix='tennis-analysis-worker-'), 'worker.sock')
+
+
+class AnalysisWorker:
+    def __init__(self):
+        self.address = None
+        self.authkey = None
+        self.process = None
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        self.address = new_worker_address()
+        self.authkey = secrets.token_bytes(32)
+        env = dict(os.environ, **{WORKER_ADDRESS_ENV: self.address, WORKER_AUTHKEY_ENV: self.authkey.hex()})
+        self.process = subprocess.Popen([sys.executable, '-m', 'pipeline.analysis_worker'], cwd=PROJECT_ROOT,
+                                        env=env)
+        return self.process
+
+    def connect(self):
+        if not self.is_running():
+            return None
+        try:
+            return Client(self.address, authkey=self.authkey)
+        except OSError:
+            return None
+
+    def ensure_started(self, startup_timeout=180, poll_interval=0.5):
+        conn = self.connect()
+        if conn is not None:
+            return conn
+
+        self.stop()
+        process = self.start()
+        deadline = time.monotonic() + startup_timeout
+        while time.monotonic() < deadline:
+            if self.process is not process:
+                raise RuntimeError("Analysis worker was stopped while starting")
+            if process.poll() is not None:
+                raise RuntimeError(f"Analysis worker exited with code {process.returncode}")
+            conn = self.connect()
+            if conn is not None:
+                return conn
+            time.sleep(poll_interval)
+        self.stop()
+        raise TimeoutError("Analysis worker did not start in time.")
+
+    def submit(self, video_name, on_output=None, on_progress=None):
+        conn = self.ensure_started()
+        output = []
+        with conn:
+            conn.send({'type': 'analyze', 'video_name': video_name})
+            while True:
+                message = conn.recv()
+                if message['type'] == 'output':
+                    output.append(message['text'])
+                    if on_output is not None:
+                        on_output(message['text'])
+                elif message['type'] == 'progress':
+                    if on_progress is not None:
+                        on_progress(message['event'])
+                elif message['type'] == 'done':
+                    return message['returncode'], ''.join(output)
+
+    def shutdown(self, timeout=5):
+        # A busy worker only reads the request once its current job is done, so the request goes out from a daemon
+        # thread and the worker is terminated if it has not exited within the timeout
+        if self.is_running():
+            requester = threading.Thread(target=_request_shutdown, args=(self.address, self.authkey), daemon=True)
+            requester.start()
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                pass
+        self.stop(timeout)
+
+    def stop(self, timeout=5):
+        if self.process is not None:
+            if self.process.poll() is None:
+                self.process.terminate()
+                try:
+                    self.process.wait(timeout)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+                    self.process.wait()
+            self.process = None
+        if self.address and os.path.isabs(self.address) and sys.platform != 'win32':
+            shutil.rmtree(os.path.dirname(self.address), ignore_errors=True)
+        self.address = self.authkey = None
+
+
+def _request_shutdown(address, authkey):
+    try:
+        with Client(address, authkey=authkey) as conn:
+            conn.send({'type': 'shutdown'})
+            conn.recv()
+    except (OSError, EOFError):
+        pass
+
+if __name__ == "__main__":
+    serve()
@@ -1 +1,5 @@
-from .process_video import read_video, save_video
+from .process_video import iter_video, read_video, read_first_frame, sample_frames, save_video
+from .async_video_writer import AsyncVideoWriter, save_videos_async
+from .prefetch_decoder import PrefetchDecoder
+from .live_capture import LiveCapture, CAPTURE_DROP_POLICIES
+from .playback_buffer import PlaybackBuffer
@@ -0,0 +1,118 @@
+import queue
+import threading
+import time
+from itertools import zip_longest
+import cv2
+from profiling import trace_span
+
+_STOP = object()
+
+
+class AsyncVideoWriter:
+    def __init__(self, output_path, fps=24, queue_size=32, fourcc='MJPG'):
+        self.output_path = output_path
+        self.fps = fps
+        self.fourcc = fourcc
+        self.queue_size = queue_size
+        self.frames_written = 0
+        self.encode_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.max_queue_depth = 0
+        self.error = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._start_time = time.perf_counter()
+        self._end_time = None
+        self._thread = threading.Thread(target=self._run, name=f"encoder:{output_path}", daemon=True)
+        self._thread.start()
+
+    def write(self, frame):
+        # Blocks while the queue is full; the time spent waiting is the back-pressure from the encoder
+        if self.error is not None:
+            raise self.error
+        start = time.perf_counter()
+        self._queue.put(frame)
+        self.wait_seconds += time.perf_counter() - start
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.get_stats()
+
+    def get_stats(self):
+        end_time = self._end_time or time.perf_counter()
+        elapsed = end_time - self._start_time
+        return {
+            'output_path': self.output_path,
+            'frames_written': self.frames_written,
+            'elapsed_seconds': elapsed,
+            'encode_seconds': self.encode_seconds,
+            'producer_wait_seconds': self.wait_seconds,
+            'max_queue_depth': self.max_queue_depth,
+            'queue_size': self.queue_size,
+            'frames_per_second': self.frames_written / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def _run(self):
+        writer = None
+        try:
+            with trace_span('encode_video', output_path=self.output_path):
+                while True:
+                    frame = self._queue.get()
+                    if frame is _STOP:
+                        break
+                    start = time.perf_counter()
+                    if writer is None:
+                        height, width = frame.shape[:2]
+                        writer = cv2.VideoWriter(self.output_path, cv2.VideoWriter_fourcc(*self.fourcc),
+                                                 self.fps, (width, height))
+                    writer.write(frame)
+                    self.encode_seconds += time.perf_counter() - start
+                    self.frames_written += 1
+        except Exception as e:
+            self.error = e
+            # Keep draining so a producer blocked on a full queue can reach close()
+            while self._queue.get() is not _STOP:
+                pass
+        finally:
+            if writer is not None:
+                writer.release()
+            self._end_time = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _close_writers(writers):
+    # Every writer is closed even when one of them fails, so no encoder thread is left running
+    stats, errors = [], []
+    for writer in writers:
+        try:
+            stats.append(writer.close())
+        except Exception as e:
+            errors.append(e)
+    return stats, errors
+
+
+def save_videos_async(frame_streams, fps=24, queue_size=32):
+    writers = [AsyncVideoWriter(output_path, fps=fps, queue_size=queue_size) for output_path in frame_streams]
+    try:
+        # Frames are pulled from every stream in turn so all encoders stay busy at once
+        for frames in zip_longest(*frame_streams.values()):
+            for writer, frame in zip(writers, frames):
+                if frame is not None:
+                    writer.write(frame)
+    except BaseException:
+        # The exception already on its way out is the one to report; close errors would only hide it
+        _close_writers(writers)
+        raise
+    stats, errors = _close_writers(writers)
+    if errors:
+        raise errors[0]
+    return stats
@@ -0,0 +1,132 @@
+import queue
+import threading
+import time
+import cv2
+from profiling import trace_span
+
+CAPTURE_DROP_POLICIES = ('latest', 'oldest', 'none')
+
+_END = object()
+
+
+class LiveCapture:
+    def __init__(self, source, target_size=None, drop_policy='latest', queue_size=4, pace=None):
+        # source is a camera index or a video file; files are paced at their native fps by default so they stand
+        # in for a camera. Frames come out as (frame_index, capture_time, frame), and when the consumer falls
+        # behind, 'latest' keeps only the newest frame, 'oldest' evicts the oldest queued frame and 'none' blocks
+        # the capture instead of dropping
+        if drop_policy not in CAPTURE_DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy {drop_policy!r}, expected one of {CAPTURE_DROP_POLICIES}")
+        self.source = source
+        self.is_camera = isinstance(source, int)
+        self.drop_policy = drop_policy
+        self.pace = not self.is_camera if pace is None else pace
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.error = None
+
+        self._cap = cv2.VideoCapture(source)
+        if not self._cap.isOpened():
+            raise ValueError(f"Could not open capture source {source!r}")
+        if self.is_camera:
+            # Keep the driver from queueing stale frames behind our own queue
+            self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 30.0
+        width = self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+        height = self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        self.frame_size = (int(width), int(height))
+        self.scale = 1.0
+        if target_size and max(width, height) > target_size:
+            self.scale = target_size / max(width, height)
+            self.output_size = (round(width * self.scale), round(height * self.scale))
+
+        self._queue = queue.Queue(maxsize=1 if drop_policy == 'latest' else queue_size)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"capture:{source}", daemon=True)
+        self._thread.start()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = self._queue.get()
+        if item is _END:
+            self._queue.put(_END)
+            if self.error is not None:
+                raise self.error
+            raise StopIteration
+        return item
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def close(self):
+        self._stop.set()
+        while self._thread.is_alive():
+            try:
+                self._queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self._thread.join()
+        return self.get_stats()
+
+    def get_stats(self):
+        return {
+            'source': self.source,
+            'fps': self.fps,
+            'scale': self.scale,
+            'frames_captured': self.frames_captured,
+            'frames_dropped': self.frames_dropped,
+        }
+
+    def _run(self):
+        try:
+            with trace_span('live_capture', source=str(self.source), drop_policy=self.drop_policy):
+                started = time.perf_counter()
+                while not self._stop.is_set():
+                    ret, frame = self._cap.read()
+                    if not ret:
+                        break
+                    capture_time = time.perf_counter()
+                    if self.pace:
+                        # The frame is due at its presentation time; if decoding ran late, that lateness counts
+                        # towards latency just like a slow camera would
+                        due = started + self.frames_captured / self.fps
+                        if due > capture_time:
+                            time.sleep(due - capture_time)
+                        capture_time = due
+                    if self.scale != 1.0:
+                        frame = cv2.resize(frame, self.output_size, interpolation=cv2.INTER_LINEAR)
+                    self._put((self.frames_captured, capture_time, frame))
+                    self.frames_captured += 1
+        except Exception as e:
+            self.error = e
+        finally:
+            self._cap.release()
+            self._queue.put(_END)
+
+    def _put(self, item):
+        if self.drop_policy == 'none':
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+            return
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.frames_dropped += 1
+                except queue.Empty:
+                    pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
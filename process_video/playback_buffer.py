@@ -0,0 +1,209 @@
+import threading
+import time
+from collections import deque
+import cv2
+
+
+class PlaybackBuffer:
+    def __init__(self, video_paths, display_size=(640, 360), capacity=48, fps=None):
+        # Decodes every stream at the same frame index on a background thread and keeps the scaled RGB frames in a
+        # ring buffer, so the UI thread only has to hand them to the toolkit
+        self.video_paths = list(video_paths)
+        self.display_size = display_size
+        self.capacity = capacity
+        self.frames_decoded = 0
+        self.frames_shown = 0
+        self.frames_skipped = 0
+        self.underruns = 0
+        self.error = None
+
+        caps = [cv2.VideoCapture(path) for path in self.video_paths]
+        try:
+            for cap, path in zip(caps, self.video_paths):
+                if not cap.isOpened():
+                    raise ValueError(f"Could not open {path}")
+            self.fps = fps or caps[0].get(cv2.CAP_PROP_FPS) or 25.0
+            counts = [int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) for cap in caps]
+            # Streams are cut to the shortest so every buffered entry has a frame from each of them
+            self.frame_count = min(counts) if all(counts) else 0
+        except Exception:
+            for cap in caps:
+                cap.release()
+            raise
+        self._caps = caps
+
+        self.speed = 1.0
+        self.paused = False
+        self.position = 0
+        self._buffer = deque()
+        self._condition = threading.Condition()
+        self._step = 1
+        self._starved = False
+        # Buffer entries and the playback clock count frames from the last seek, running on past the end when the
+        # video loops, so ordering survives the wrap back to frame 0
+        self._generation = 0
+        self._seek_to = 0
+        self._last_shown = -1
+        self._anchor_position = 0
+        self._anchor_time = time.perf_counter()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="playback-decoder", daemon=True)
+        self._thread.start()
+
+    def poll(self, now=None):
+        # Returns (frame_index, frames) when a newer frame is due, otherwise None; never waits for the decoder
+        now = time.perf_counter() if now is None else now
+        with self._condition:
+            if self.error is not None:
+                raise self.error
+            target = self._target_position(now)
+            entry = None
+            while self._buffer and self._buffer[0][0] <= target:
+                if entry is not None:
+                    self.frames_skipped += 1
+                entry = self._buffer.popleft()
+            if entry is None:
+                if not self.paused and not self._buffer and target >= self._last_shown + self._step:
+                    # Decoding fell behind: hold the current frame and let the clock wait for the next one instead
+                    # of skipping ahead once it arrives
+                    if not self._starved:
+                        self.underruns += 1
+                        self._starved = True
+                    self._anchor(self._last_shown + self._step, now)
+                return None
+
+            self._condition.notify_all()
+            self._starved = False
+            self._last_shown, frames = entry
+            self.frames_shown += 1
+            self.position = self._last_shown % self.frame_count if self.frame_count else self._last_shown
+            return self.position, frames
+
+    def seek(self, frame_index):
+        with self._condition:
+            if self.frame_count:
+                frame_index = min(max(int(frame_index), 0), self.frame_count - 1)
+            self.position = frame_index
+            self._restart_decoding(frame_index, time.perf_counter())
+
+    def set_speed(self, speed):
+        with self._condition:
+            now = time.perf_counter()
+            self._anchor(self._target_position(now), now)
+            self.speed = speed
+            # Fast playback skips frames in the decoder rather than decoding frames that would never be shown
+            step = max(1, int(speed))
+            if step != self._step:
+                self._step = step
+                self._restart_decoding(self.position + 1, now)
+
+    def set_paused(self, paused):
+        with self._condition:
+            now = time.perf_counter()
+            self._anchor(self._target_position(now), now)
+            self.paused = paused
+
+    def get_stats(self):
+        with self._condition:
+            return {
+                'frames_decoded': self.frames_decoded,
+                'frames_shown': self.frames_shown,
+                'frames_skipped': self.frames_skipped,
+                'underruns': self.underruns,
+                'buffered': len(self._buffer),
+            }
+
+    def close(self):
+        with self._condition:
+            self._stop = True
+            self._condition.notify_all()
+        self._thread.join()
+        return self.get_stats()
+
+    def _target_position(self, now):
+        if self.paused:
+            return self._anchor_position
+        return self._anchor_position + (now - self._anchor_time) * self.fps * self.speed
+
+    def _anchor(self, position, now):
+        self._anchor_position = position
+        self._anchor_time = now
+
+    def _restart_decoding(self, frame_index, now):
+        if self.frame_count:
+            frame_index %= self.frame_count
+        self._generation += 1
+        self._seek_to = frame_index
+        self._buffer.clear()
+        self._last_shown = frame_index - self._step
+        self._starved = False
+        self._anchor(frame_index, now)
+        self._condition.notify_all()
+
+    def _run(self):
+        generation = None
+        index = loop_offset = 0
+        try:
+            while True:
+                with self._condition:
+                    while not self._stop and generation == self._generation and len(self._buffer) >= self.capacity:
+                        self._condition.wait()
+                    if self._stop:
+                        return
+                    restart = generation != self._generation
+                    if restart:
+                        generation = self._generation
+                        index, loop_offset = self._seek_to, 0
+                    step = self._step
+
+                if restart:
+                    self._set_position(index)
+                frames = self._read_frames(step)
+                if frames is None:
+                    if index == 0:
+                        raise ValueError("Could not read any frames for playback")
+                    # The frame count was missing or too high: the shortest stream ends here, so loop from the start
+                    with self._condition:
+                        self.frame_count = index
+                    loop_offset += index
+                    index = 0
+                    self._set_position(0)
+                    continue
+
+                with self._condition:
+                    if generation == self._generation:
+                        self._buffer.append((loop_offset + index, frames))
+                        self.frames_decoded += 1
+                index += step
+                if self.frame_count and index >= self.frame_count:
+                    loop_offset += self.frame_count
+                    index = 0
+                    self._set_position(0)
+        except Exception as e:
+            with self._condition:
+                self.error = e
+        finally:
+            for cap in self._caps:
+                cap.release()
+
+    def _set_position(self, index):
+        for cap in self._caps:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+
+    def _read_frames(self, step):
+        frames = []
+        for cap in self._caps:
+            ret, frame = cap.read()
+            if not ret:
+                return None
+            for _ in range(step - 1):
+                cap.grab()
+            frame = cv2.resize(frame, self.display_size, interpolation=cv2.INTER_AREA)
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        return frames
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
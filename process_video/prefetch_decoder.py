@@ -0,0 +1,100 @@
+import queue
+import threading
+import time
+import cv2
+from profiling import trace_span
+
+_END = object()
+
+
+class PrefetchDecoder:
+    def __init__(self, video_path, target_size=None, start_frame=0, queue_size=16):
+        # With target_size the longer side is scaled down to it the same way YOLO letterboxes, so the detector
+        # skips its own resize and sees identical input
+        self.video_path = video_path
+        self.target_size = target_size
+        self.queue_size = queue_size
+        self.frames_decoded = 0
+        self.decode_seconds = 0.0
+        self.resize_seconds = 0.0
+        self.consumer_wait_seconds = 0.0
+        self.error = None
+
+        self._cap = cv2.VideoCapture(video_path)
+        width = self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+        height = self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        self.scale = 1.0
+        if target_size and max(width, height) > target_size:
+            self.scale = target_size / max(width, height)
+            self.output_size = (round(width * self.scale), round(height * self.scale))
+
+        self._start_frame = start_frame
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"decoder:{video_path}", daemon=True)
+        self._thread.start()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        frame = self._queue.get()
+        self.consumer_wait_seconds += time.perf_counter() - start
+        if frame is _END:
+            # Leave the marker in place so later calls keep raising StopIteration
+            self._queue.put(_END)
+            if self.error is not None:
+                raise self.error
+            raise StopIteration
+        return frame
+
+    def close(self):
+        self._stop.set()
+        while self._thread.is_alive():
+            try:
+                self._queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self._thread.join()
+        return self.get_stats()
+
+    def get_stats(self):
+        return {
+            'video_path': self.video_path,
+            'frames_decoded': self.frames_decoded,
+            'scale': self.scale,
+            'decode_seconds': self.decode_seconds,
+            'resize_seconds': self.resize_seconds,
+            'consumer_wait_seconds': self.consumer_wait_seconds,
+        }
+
+    def _run(self):
+        try:
+            with trace_span('decode_video', video_path=self.video_path, scale=self.scale):
+                for _ in range(self._start_frame):
+                    if not self._cap.grab():
+                        return
+                while not self._stop.is_set():
+                    start = time.perf_counter()
+                    ret, frame = self._cap.read()
+                    self.decode_seconds += time.perf_counter() - start
+                    if not ret:
+                        break
+                    if self.scale != 1.0:
+                        start = time.perf_counter()
+                        frame = cv2.resize(frame, self.output_size, interpolation=cv2.INTER_LINEAR)
+                        self.resize_seconds += time.perf_counter() - start
+                    self.frames_decoded += 1
+                    self._queue.put(frame)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._cap.release()
+            self._queue.put(_END)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
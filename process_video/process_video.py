@@ -1,27 +1,67 @@
 import cv2
 
 
+def iter_video(video_path, start_frame=0):
+    cap = cv2.VideoCapture(video_path)
+    try:
+        # grab() skips without converting the frame, and unlike seeking it stays frame-accurate for every codec
+        for _ in range(start_frame):
+            if not cap.grab():
+                return
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+
 def read_video(video_path):
+    return list(iter_video(video_path))
+
+
+def read_first_frame(video_path):
     cap = cv2.VideoCapture(video_path)
-    frames = []
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        frames.append(frame)
+    ret, frame = cap.read()
     cap.release()
-    return frames
+    if not ret:
+        raise ValueError(f"Could not read a frame from {video_path}")
+    return frame
+
+
+def sample_frames(video_path, count):
+    cap = cv2.VideoCapture(video_path)
+    try:
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total_frames <= 0:
+            raise ValueError(f"Could not read the frame count of {video_path}")
+        frames = []
+        for frame_index in sorted({int(i * (total_frames - 1) / max(count - 1, 1)) for i in range(count)}):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+            ret, frame = cap.read()
+            if ret:
+                frames.append(frame)
+        return frames
+    finally:
+        cap.release()
 
 
 def save_video(frames, output_path, fps=24):
-    if not frames:
+    frames = iter(frames)
+    first_frame = next(frames, None)
+    if first_frame is None:
         print("No frames to save.")
-        return
+        return 0
 
-    height, width, _ = frames[0].shape
+    height, width, _ = first_frame.shape
     fourcc = cv2.VideoWriter_fourcc(*'MJPG')
     out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
 
+    out.write(first_frame)
+    frame_count = 1
     for frame in frames:
         out.write(frame)
-    out.release()
\ No newline at end of file
+        frame_count += 1
+    out.release()
+    return frame_count
@@ -0,0 +1,5 @@
+from .tracing import Tracer, enable_tracing, disable_tracing, get_tracer, trace_span
+from .memory import MemoryProfiler, read_rss
+from .latency import RollingLatencyStats
+from .progress import (ProgressReporter, enable_progress, disable_progress, get_progress_reporter, progress_stage,
+                       report_frames, report_event, format_progress_line, parse_progress_line)
@@ -0,0 +1,64 @@
+import time
+from collections import deque
+import numpy as np
+
+
+class RollingLatencyStats:
+    def __init__(self, window=300, latency_budget=None):
+        # Percentiles and rates cover the last `window` frames; the totals cover the whole run
+        self.latency_budget = latency_budget
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.frames_over_budget = 0
+        self._started = time.perf_counter()
+
+    def record_processed(self, latency, now=None):
+        self.frames_processed += 1
+        self._latencies.append(latency)
+        self._outcomes.append((time.perf_counter() if now is None else now, True))
+        if self.latency_budget is not None and latency > self.latency_budget:
+            self.frames_over_budget += 1
+
+    def record_dropped(self, count=1, now=None):
+        now = time.perf_counter() if now is None else now
+        self.frames_dropped += count
+        for _ in range(min(count, self._outcomes.maxlen)):
+            self._outcomes.append((now, False))
+
+    def snapshot(self):
+        latencies = np.array(self._latencies, dtype=np.float64)
+        processed = sum(1 for _, was_processed in self._outcomes if was_processed)
+        snapshot = {
+            'frames_processed': self.frames_processed,
+            'frames_dropped': self.frames_dropped,
+            'frames_over_budget': self.frames_over_budget,
+            'drop_rate': 1.0 - processed / len(self._outcomes) if self._outcomes else 0.0,
+            'processed_fps': 0.0,
+            'latency_p50_ms': None,
+            'latency_p95_ms': None,
+            'latency_max_ms': None,
+            'elapsed_seconds': time.perf_counter() - self._started,
+        }
+        if len(latencies):
+            snapshot.update({
+                'latency_p50_ms': float(np.percentile(latencies, 50)) * 1000,
+                'latency_p95_ms': float(np.percentile(latencies, 95)) * 1000,
+                'latency_max_ms': float(latencies.max()) * 1000,
+            })
+        window_seconds = self._outcomes[-1][0] - self._outcomes[0][0] if len(self._outcomes) > 1 else 0.0
+        if window_seconds > 0:
+            snapshot['processed_fps'] = (processed - 1) / window_seconds if processed > 1 else 0.0
+        return snapshot
+
+    def format_snapshot(self, snapshot=None):
+        snapshot = snapshot or self.snapshot()
+        if snapshot['latency_p50_ms'] is None:
+            latency = "latency n/a"
+        else:
+            latency = (f"latency p50 {snapshot['latency_p50_ms']:.0f} ms, p95 {snapshot['latency_p95_ms']:.0f} ms, "
+                       f"max {snapshot['latency_max_ms']:.0f} ms")
+        return (f"{snapshot['frames_processed']} processed, {snapshot['frames_dropped']} dropped | "
+                f"{snapshot['processed_fps']:.1f} fps | {latency} | drop rate {snapshot['drop_rate']:.1%} | "
+                f"{snapshot['frames_over_budget']} over budget")
@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def read_rss():
+    # Current and peak resident set size in bytes; the peak is None where /proc is unavailable
+    try:
+        with open('/proc/self/status') as f:
+            status = dict(line.split(':', 1) for line in f if ':' in line)
+        return int(status['VmRSS'].split()[0]) * 1024, int(status['VmHWM'].split()[0]) * 1024
+    except (OSError, KeyError, ValueError):
+        if resource is None:
+            return 0, None
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, None
+
+
+def reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class MemoryProfiler:
+    def __init__(self, top_allocations=10, traceback_frames=1):
+        self.top_allocations = top_allocations
+        self.traceback_frames = traceback_frames
+        self.stages = []
+        self.largest_allocations = []
+        self.can_reset_rss = False
+        self._stack = []
+        self._thread_id = None
+        self._baseline_snapshot = None
+        self._tracer = None
+        self._started_tracemalloc = False
+
+    def start(self, tracer):
+        # Only spans on the starting thread are measured; encoder threads would corrupt the peak resets
+        self._thread_id = threading.get_ident()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.traceback_frames)
+            self._started_tracemalloc = True
+        self.can_reset_rss = reset_peak_rss()
+        self._baseline_snapshot = tracemalloc.take_snapshot()
+        self._tracer = tracer
+        tracer.listeners.append(self)
+        return self
+
+    def stop(self):
+        if self._tracer is not None:
+            self._tracer.listeners.remove(self)
+            self._tracer = None
+        # Module imports would otherwise crowd out the data allocations at the top of the list
+        import_filters = [tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                          tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>')]
+        statistics = tracemalloc.take_snapshot().filter_traces(import_filters).compare_to(
+            self._baseline_snapshot.filter_traces(import_filters), 'lineno'
+        )
+        self.largest_allocations = [
+            {'location': str(stat.traceback), 'size_bytes': stat.size_diff, 'count': stat.count_diff}
+            for stat in statistics[:self.top_allocations]
+        ]
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        return self.get_report()
+
+    def span_started(self, name):
+        if threading.get_ident() != self._thread_id:
+            return
+        # Resetting the peaks for this span must not lose what the enclosing spans have seen so far
+        traced_current, traced_peak = tracemalloc.get_traced_memory()
+        rss_current, rss_peak = read_rss()
+        for entry in self._stack:
+            entry['traced_peak'] = max(entry['traced_peak'], traced_peak)
+            entry['rss_peak'] = max(entry['rss_peak'], rss_peak or rss_current)
+        tracemalloc.reset_peak()
+        if self.can_reset_rss:
+            reset_peak_rss()
+        self._stack.append({
+            'name': name, 'depth': len(self._stack), 'traced_start': traced_current, 'traced_peak': traced_current,
+            'rss_start': rss_current, 'rss_peak': rss_current,
+        })
+
+    def span_finished(self, name):
+        if threading.get_ident() != self._thread_id or not self._stack:
+            return
+        traced_current, traced_peak = tracemalloc.get_traced_memory()
+        rss_current, rss_peak = read_rss()
+        entry = self._stack.pop()
+        entry['traced_peak'] = max(entry['traced_peak'], traced_peak)
+        entry['rss_peak'] = max(entry['rss_peak'], rss_peak if self.can_reset_rss else rss_current)
+        for parent in self._stack:
+            parent['traced_peak'] = max(parent['traced_peak'], entry['traced_peak'])
+            parent['rss_peak'] = max(parent['rss_peak'], entry['rss_peak'])
+
+        self.stages.append({
+            'name': entry['name'],
+            'depth': entry['depth'],
+            'rss_start_bytes': entry['rss_start'],
+            'rss_end_bytes': rss_current,
+            'rss_peak_bytes': entry['rss_peak'],
+            'traced_peak_bytes': entry['traced_peak'] - entry['traced_start'],
+            'traced_retained_bytes': traced_current - entry['traced_start'],
+        })
+
+    def get_peak_rss(self):
+        return max((stage['rss_peak_bytes'] for stage in self.stages), default=read_rss()[0])
+
+    def get_report(self):
+        return {
+            'peak_rss_bytes': self.get_peak_rss(),
+            'rss_peak_is_exact': self.can_reset_rss,
+            'stages': self.stages,
+            'largest_allocations': self.largest_allocations,
+        }
+
+    def write_report(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.get_report(), f, indent=2)
+
+    def print_report(self, max_depth=0):
+        mb = 1024 * 1024
+        print(f"{'stage':<30} {'rss start':>10} {'rss peak':>10} {'rss end':>10} {'py peak':>10} {'py kept':>10}")
+        for stage in self.stages:
+            if stage['depth'] > max_depth:
+                continue
+            print(f"{'  ' * stage['depth'] + stage['name']:<30} {stage['rss_start_bytes'] / mb:>9.1f}M "
+                  f"{stage['rss_peak_bytes'] / mb:>9.1f}M {stage['rss_end_bytes'] / mb:>9.1f}M "
+                  f"{stage['traced_peak_bytes'] / mb:>9.1f}M {stage['traced_retained_bytes'] / mb:>9.1f}M")
+        print(f"Peak RSS {self.get_peak_rss() / mb:.1f} MB" + ("" if self.can_reset_rss else " (sampled at span edges)"))
+        if self.largest_allocations:
+            print("Largest allocations still held at the end of the run:")
+            for allocation in self.largest_allocations:
+                print(f"  {allocation['size_bytes'] / mb:>8.2f} MB in {allocation['count']:>6} blocks  "
+                      f"{allocation['location']}")
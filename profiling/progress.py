@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+
+PROGRESS_LINE_PREFIX = '[PROGRESS] '
+
+_reporter = None
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, reporter, stage, total_frames):
+        self.reporter = reporter
+        self.stage = stage
+        self.total_frames = total_frames
+
+    def __enter__(self):
+        self.reporter.start_stage(self.stage, self.total_frames)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.reporter.finish_stage(self.stage, failed=exc_type is not None)
+        return False
+
+
+class ProgressReporter:
+    def __init__(self, listener, min_interval=0.5):
+        # Frame counts are throttled to one event per min_interval; every other event goes out immediately
+        self.listener = listener
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._stage = None
+        self._total_frames = None
+        self._frames_done = 0
+        self._frames_resumed = 0
+        self._frames_reported = 0
+        self._stage_started = None
+        self._last_frames_event = 0.0
+
+    def emit(self, event_type, **fields):
+        event = {'type': event_type, **fields}
+        with self._lock:
+            self.listener(event)
+
+    def start_stage(self, stage, total_frames=None):
+        self._stage = stage
+        self._total_frames = total_frames
+        self._frames_done = self._frames_resumed = self._frames_reported = 0
+        self._stage_started = self._last_frames_event = time.perf_counter()
+        self.emit('stage', stage=stage, status='started', total_frames=total_frames)
+
+    def finish_stage(self, stage, failed=False):
+        seconds = time.perf_counter() - self._stage_started
+        if stage == self._stage and self._frames_done != self._frames_reported:
+            self._emit_frames(time.perf_counter())
+        self._stage = None
+        self.emit('stage', stage=stage, status='failed' if failed else 'finished', seconds=seconds)
+
+    def advance(self, stage, frames=1, resumed=False):
+        # Resumed frames count towards the total but not the throughput, so the ETA is not skewed by cached work
+        if stage != self._stage:
+            return
+        self._frames_done += frames
+        if resumed:
+            self._frames_resumed += frames
+        now = time.perf_counter()
+        if now - self._last_frames_event >= self.min_interval:
+            self._emit_frames(now)
+
+    def _emit_frames(self, now):
+        self._last_frames_event = now
+        self._frames_reported = self._frames_done
+        elapsed = now - self._stage_started
+        processed = self._frames_done - self._frames_resumed
+        frames_per_second = processed / elapsed if elapsed > 0 else 0.0
+        eta_seconds = None
+        if self._total_frames and frames_per_second > 0:
+            eta_seconds = max(self._total_frames - self._frames_done, 0) / frames_per_second
+        self.emit('frames', stage=self._stage, frames_done=self._frames_done, frames_total=self._total_frames,
+                  frames_per_second=frames_per_second, eta_seconds=eta_seconds)
+
+
+def enable_progress(listener, min_interval=0.5):
+    global _reporter
+    _reporter = ProgressReporter(listener, min_interval=min_interval)
+    return _reporter
+
+
+def disable_progress():
+    global _reporter
+    reporter, _reporter = _reporter, None
+    return reporter
+
+
+def get_progress_reporter():
+    return _reporter
+
+
+def progress_stage(stage, total_frames=None):
+    if _reporter is None:
+        return _NULL_STAGE
+    return _Stage(_reporter, stage, total_frames)
+
+
+def report_frames(stage, frames=1, resumed=False):
+    if _reporter is not None:
+        _reporter.advance(stage, frames, resumed=resumed)
+
+
+def report_event(event_type, **fields):
+    if _reporter is not None:
+        _reporter.emit(event_type, **fields)
+
+
+def format_progress_line(event):
+    return PROGRESS_LINE_PREFIX + json.dumps(event)
+
+
+def parse_progress_line(line):
+    # Returns the event for a progress line from a piped `main.py --progress` run, otherwise None
+    if not line.startswith(PROGRESS_LINE_PREFIX):
+        return None
+    try:
+        return json.loads(line[len(PROGRESS_LINE_PREFIX):])
+    except ValueError:
+        return None
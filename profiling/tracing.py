@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+
+_tracer = None
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'args', 'start_ns')
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start_ns = None
+
+    def __enter__(self):
+        for listener in self.tracer.listeners:
+            listener.span_started(self.name)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.tracer.record(self.name, self.start_ns, time.perf_counter_ns(), self.args)
+        for listener in self.tracer.listeners:
+            listener.span_finished(self.name)
+        return False
+
+
+class Tracer:
+    def __init__(self):
+        self.events = []
+        self.origin_ns = time.perf_counter_ns()
+        self.pid = os.getpid()
+        self.listeners = []
+        self._lock = threading.Lock()
+
+    def span(self, name, **args):
+        return _Span(self, name, args)
+
+    def record(self, name, start_ns, end_ns, args=None):
+        event = (name, start_ns, end_ns, threading.get_ident(), threading.current_thread().name, args or {})
+        with self._lock:
+            self.events.append(event)
+
+    def to_chrome_trace(self):
+        trace_events = []
+        thread_names = {}
+        for name, start_ns, end_ns, thread_id, thread_name, args in self.events:
+            thread_names[thread_id] = thread_name
+            trace_events.append({
+                'name': name, 'cat': 'pipeline', 'ph': 'X', 'pid': self.pid, 'tid': thread_id,
+                'ts': (start_ns - self.origin_ns) / 1000, 'dur': (end_ns - start_ns) / 1000, 'args': args,
+            })
+        for thread_id, thread_name in thread_names.items():
+            trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': thread_id,
+                                 'args': {'name': thread_name}})
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def summary(self):
+        stats = {}
+        for name, start_ns, end_ns, _, _, _ in self.events:
+            seconds = (end_ns - start_ns) / 1e9
+            entry = stats.setdefault(name, {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            entry['count'] += 1
+            entry['total_seconds'] += seconds
+            entry['max_seconds'] = max(entry['max_seconds'], seconds)
+        return stats
+
+    def print_summary(self):
+        print(f"{'span':<30} {'count':>7} {'total s':>10} {'mean ms':>10} {'max ms':>10}")
+        for name, entry in sorted(self.summary().items(), key=lambda item: -item[1]['total_seconds']):
+            print(f"{name:<30} {entry['count']:>7} {entry['total_seconds']:>10.3f} "
+                  f"{entry['total_seconds'] * 1000 / entry['count']:>10.2f} {entry['max_seconds'] * 1000:>10.2f}")
+
+
+def enable_tracing():
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def disable_tracing():
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def get_tracer():
+    return _tracer
+
+
+def trace_span(name, **args):
+    # With tracing off this is a global lookup and a shared no-op context manager
+    if _tracer is None:
+        return _NULL_SPAN
+    return _tracer.span(name, **args)
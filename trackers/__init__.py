@@ -1 +1,3 @@
 from .tennis_ball_tracker import TennisBallTracker
+from .detection_cache import DetectionCache
+from .online_ball_tracker import OnlineBallTracker, interpolate_ball_track_online
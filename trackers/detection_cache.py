@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from bounding_boxes import as_ball_track, is_ball_track
+
+
+def compute_file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DetectionCache:
+    def __init__(self, cache_dir="tracker_stub/cache", max_size_mb=512, partial_max_age_days=7,
+                 partial_lock_timeout=600):
+        self.cache_dir = cache_dir
+        # A checkpoint lock that has not been refreshed for this many seconds belongs to a run that died
+        self.partial_lock_timeout = partial_lock_timeout
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.partial_max_age_seconds = partial_max_age_days * 24 * 3600
+        self.digest_index_path = os.path.join(cache_dir, "file_digests.json")
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, video_path, model_path, params):
+        key = hashlib.sha256()
+        key.update(self.get_file_digest(video_path).encode())
+        if os.path.isfile(model_path):
+            key.update(self.get_file_digest(model_path).encode())
+        else:
+            key.update(str(model_path).encode())
+        key.update(json.dumps(params, sort_keys=True).encode())
+        return key.hexdigest()
+
+    def get_file_digest(self, path):
+        # Hashing a long match takes a while, so digests are remembered per (path, size, mtime)
+        stat = os.stat(path)
+        index_key = os.path.abspath(path)
+        digest_index = self._read_digest_index()
+        entry = digest_index.get(index_key)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['digest']
+
+        digest = compute_file_digest(path)
+        digest_index[index_key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': digest}
+        self._write_atomic(self.digest_index_path, json.dumps(digest_index).encode())
+        return digest
+
+    def load(self, key):
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'rb') as f:
+                tennis_ball_track = np.load(f, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        if not is_ball_track(tennis_ball_track):
+            return None
+
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return tennis_ball_track
+
+    def store(self, key, tennis_ball_positions):
+        tennis_ball_track = as_ball_track(tennis_ball_positions)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, tennis_ball_track, allow_pickle=False)
+            os.replace(tmp_path, self._entry_path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def acquire_partial(self, key):
+        # Only one run at a time may resume, extend or discard the checkpoints for a key; returns False while
+        # another live run holds them
+        lock_path = self._lock_path(key)
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                if not self._is_lock_stale(lock_path):
+                    return False
+                # Renaming first means only one of several runs finding the same stale lock gets to remove it
+                stale_path = f"{lock_path}.{os.getpid()}.stale"
+                try:
+                    os.replace(lock_path, stale_path)
+                except FileNotFoundError:
+                    continue
+                if not self._is_lock_stale(stale_path):
+                    # Another run took the lock over in between; hand it back
+                    try:
+                        os.link(stale_path, lock_path)
+                    except OSError:
+                        pass
+                    os.remove(stale_path)
+                    return False
+                os.remove(stale_path)
+                continue
+            with os.fdopen(fd, 'w') as f:
+                f.write(str(os.getpid()))
+            return True
+
+    def release_partial(self, key):
+        try:
+            os.remove(self._lock_path(key))
+        except FileNotFoundError:
+            pass
+
+    def load_partial(self, key):
+        # Returns the contiguous chunks completed by an interrupted run, or None if there is nothing to resume
+        partial_dir = self._partial_path(key)
+        try:
+            with open(os.path.join(partial_dir, 'meta.json'), 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('key') != key:
+            shutil.rmtree(partial_dir, ignore_errors=True)
+            return None
+
+        chunks = []
+        frame_count = 0
+        for chunk_index in range(meta.get('chunk_count', 0)):
+            try:
+                with open(os.path.join(partial_dir, f"chunk_{chunk_index:06d}.npy"), 'rb') as f:
+                    chunk = np.load(f, allow_pickle=False)
+            except (OSError, ValueError):
+                break
+            if not is_ball_track(chunk) or len(chunk) == 0 or chunk['frame'][0] != frame_count:
+                break
+            chunks.append(chunk)
+            frame_count += len(chunk)
+        if not chunks:
+            self.discard_partial(key)
+            return None
+        if len(chunks) < meta['chunk_count']:
+            meta.update({'chunk_count': len(chunks), 'frame_count': frame_count})
+            self._write_atomic(os.path.join(partial_dir, 'meta.json'), json.dumps(meta).encode())
+        return np.concatenate(chunks)
+
+    def append_partial(self, key, tennis_ball_track):
+        partial_dir = self._partial_path(key)
+        os.makedirs(partial_dir, exist_ok=True)
+        meta_path = os.path.join(partial_dir, 'meta.json')
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {'key': key, 'chunk_count': 0, 'frame_count': 0}
+
+        chunk_path = os.path.join(partial_dir, f"chunk_{meta['chunk_count']:06d}.npy")
+        fd, tmp_path = tempfile.mkstemp(dir=partial_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, as_ball_track(tennis_ball_track), allow_pickle=False)
+        os.replace(tmp_path, chunk_path)
+
+        # The chunk is on disk before meta counts it, so a crash in between only loses that chunk
+        meta['chunk_count'] += 1
+        meta['frame_count'] += len(tennis_ball_track)
+        self._write_atomic(meta_path, json.dumps(meta).encode())
+        try:
+            os.utime(self._lock_path(key))
+        except OSError:
+            pass
+
+    def discard_partial(self, key):
+        shutil.rmtree(self._partial_path(key), ignore_errors=True)
+
+    def evict(self):
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.partial'):
+                try:
+                    if now - os.stat(path).st_mtime > self.partial_max_age_seconds:
+                        shutil.rmtree(path, ignore_errors=True)
+                except OSError:
+                    pass
+                continue
+            if not name.endswith('.npy'):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def _partial_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.partial")
+
+    def _lock_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.lock")
+
+    def _is_lock_stale(self, lock_path):
+        try:
+            return time.time() - os.stat(lock_path).st_mtime > self.partial_lock_timeout
+        except FileNotFoundError:
+            return True
+
+    def _read_digest_index(self):
+        try:
+            with open(self.digest_index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_atomic(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
@@ -0,0 +1,157 @@
+from collections import deque
+import numpy as np
+from bounding_boxes import BALL_TRACK_DTYPE, as_ball_track
+
+
+class OnlineBallTracker:
+    def __init__(self, max_delay=30, max_lost_frames=30, gate_distance=150.0, process_noise=2.0, measurement_noise=4.0,
+                 smooth=False, frame_size=None):
+        # max_delay only bounds how long a frame may wait to be emitted; max_lost_frames is how long an unseen track
+        # keeps its position and velocity, both for gating candidates and for predicting gap frames. frame_size is
+        # (width, height), which predicted boxes are kept inside
+        self.max_delay = max_delay
+        self.max_lost_frames = max_lost_frames
+        self.frame_size = frame_size
+        self.gate_distance = gate_distance
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.smooth = smooth
+
+        self._state = None
+        self._covariance = None
+        self._state_frame = None
+        self._box_size = None
+        self._last_box = None
+        self._last_box_frame = None
+        self._pending = deque()
+
+    def update(self, frame_index, candidates):
+        # candidates: array of shape (k, 5) holding x1, y1, x2, y2, conf; returns the rows ready to emit
+        emitted = []
+        candidate = self._select_candidate(frame_index, candidates)
+
+        if candidate is None:
+            self._pending.append(frame_index)
+            while len(self._pending) > self.max_delay:
+                emitted.append(self._predict_row(self._pending.popleft()))
+            return emitted
+
+        box, conf = candidate[:4].astype(np.float64), float(candidate[4])
+        self._correct(frame_index, box)
+        if self.smooth:
+            box = self._box_around(self._state[:2])
+
+        # A gap of at most max_delay frames is filled like the offline interpolate().bfill(). Frames of a longer gap
+        # were already emitted as predictions, so the rest interpolate from the last prediction, or are back-filled
+        # once the track was lost
+        while self._pending:
+            pending_frame = self._pending.popleft()
+            if self._last_box is None:
+                emitted.append((pending_frame, box, 0.0, True))
+            else:
+                weight = (pending_frame - self._last_box_frame) / (frame_index - self._last_box_frame)
+                emitted.append((pending_frame, self._last_box + (box - self._last_box) * weight, 0.0, True))
+
+        emitted.append((frame_index, box, conf, True))
+        self._last_box = box
+        self._last_box_frame = frame_index
+        return emitted
+
+    def flush(self):
+        emitted = []
+        while self._pending:
+            pending_frame = self._pending.popleft()
+            if self._last_box is None:
+                emitted.append((pending_frame, np.full(4, np.nan), 0.0, False))
+            else:
+                emitted.append((pending_frame, self._last_box, 0.0, True))
+        return emitted
+
+    def _select_candidate(self, frame_index, candidates):
+        candidates = np.asarray(candidates, dtype=np.float64).reshape(-1, 5)
+        candidates = candidates[~np.isnan(candidates[:, :4]).any(axis=1)]
+        if len(candidates) == 0:
+            return None
+        if self._state is None:
+            return candidates[np.argmax(candidates[:, 4])]
+
+        frames_unseen = frame_index - self._state_frame
+        if frames_unseen > self.max_lost_frames:
+            # The track is stale, so start over from the most confident candidate
+            self._state = None
+            return candidates[np.argmax(candidates[:, 4])]
+
+        predicted_center = self._predicted_state(frame_index)[0][:2]
+        centers = np.column_stack(((candidates[:, 0] + candidates[:, 2]) / 2, (candidates[:, 1] + candidates[:, 3]) / 2))
+        distances = np.linalg.norm(centers - predicted_center, axis=1)
+        best = np.argmin(distances)
+        if distances[best] <= self.gate_distance * frames_unseen:
+            return candidates[best]
+        return None
+
+    def _transition(self, steps):
+        transition = np.eye(4)
+        transition[0, 2] = transition[1, 3] = steps
+        return transition
+
+    def _predicted_state(self, frame_index):
+        transition = self._transition(frame_index - self._state_frame)
+        state = transition @ self._state
+        covariance = transition @ self._covariance @ transition.T + np.eye(4) * self.process_noise
+        return state, covariance
+
+    def _correct(self, frame_index, box):
+        center = np.array([(box[0] + box[2]) / 2, (box[1] + box[3]) / 2])
+        self._box_size = np.array([box[2] - box[0], box[3] - box[1]])
+        if self._state is None:
+            self._state = np.array([center[0], center[1], 0.0, 0.0])
+            self._covariance = np.diag([self.measurement_noise, self.measurement_noise, 100.0, 100.0])
+            self._state_frame = frame_index
+            return
+
+        state, covariance = self._predicted_state(frame_index)
+        observation = np.eye(2, 4)
+        innovation = center - observation @ state
+        innovation_covariance = observation @ covariance @ observation.T + np.eye(2) * self.measurement_noise
+        gain = covariance @ observation.T @ np.linalg.inv(innovation_covariance)
+        self._state = state + gain @ innovation
+        self._covariance = (np.eye(4) - gain @ observation) @ covariance
+        self._state_frame = frame_index
+
+    def _predict_row(self, frame_index):
+        if self._state is None or frame_index - self._state_frame > self.max_lost_frames:
+            # Unseen for too long to extrapolate; the next detection starts over
+            self._last_box = None
+            return frame_index, np.full(4, np.nan), 0.0, False
+        state, _ = self._predicted_state(frame_index)
+        center = state[:2]
+        if self.frame_size is not None:
+            center = np.clip(center, 0, self.frame_size)
+        box = self._box_around(center)
+        # The delay budget ran out, so later gap frames interpolate from this prediction
+        self._last_box = box
+        self._last_box_frame = frame_index
+        return frame_index, box, 0.0, True
+
+    def _box_around(self, center):
+        half_width, half_height = self._box_size / 2
+        return np.array([center[0] - half_width, center[1] - half_height,
+                         center[0] + half_width, center[1] + half_height])
+
+
+def rows_to_ball_track(rows):
+    return np.array([(frame, box, conf, valid) for frame, box, conf, valid in rows], dtype=BALL_TRACK_DTYPE)
+
+
+def interpolate_ball_track_online(tennis_ball_positions, max_delay=30, **tracker_kwargs):
+    # Matches the offline interpolation only while every gap fits in max_delay and every detection passes the gate;
+    # beyond that, gap frames follow the Kalman prediction for up to max_lost_frames and are invalid after it, and a
+    # leading gap is left invalid instead of back-filled
+    tennis_ball_track = as_ball_track(tennis_ball_positions)
+    online_tracker = OnlineBallTracker(max_delay=max_delay, **tracker_kwargs)
+    rows = []
+    for row in tennis_ball_track:
+        candidates = np.append(row['box'], row['conf'])[None] if row['valid'] else np.empty((0, 5))
+        rows.extend(online_tracker.update(int(row['frame']), candidates))
+    rows.extend(online_tracker.flush())
+    return rows_to_ball_track(rows)
@@ -1,88 +1,289 @@
-from ultralytics import YOLO
 import cv2
 import pickle
-import pandas as pd
+from collections import deque
+from itertools import islice
+import numpy as np
+from bounding_boxes import as_ball_track, create_ball_track, get_ball_track_centers, interpolate_ball_track
+from inference_backends import check_backend, export_tennis_ball_model
+from process_video import PrefetchDecoder
+from profiling import report_event, report_frames, trace_span
+from .online_ball_tracker import OnlineBallTracker, interpolate_ball_track_online
+from utils import detect_direction_changes, get_vertical_movement
+
+
+def get_detection_params(conf=0.15, roi_crop_size=None, roi_imgsz=320, backend='pytorch', int8=False, input_size=640):
+    # Everything besides the video and weights that changes the detections; part of the detection cache key
+    params = {'conf': conf}
+    if roi_crop_size:
+        params.update({'roi_crop_size': roi_crop_size, 'roi_imgsz': roi_imgsz})
+    if backend != 'pytorch':
+        params.update({'backend': backend, 'int8': int8})
+    if input_size and not roi_crop_size:
+        params['input_size'] = input_size
+    return params
 
 
 class TennisBallTracker:
-    def __init__(self, model_path):
-        self.model = YOLO(model_path)
+    def __init__(self, model_path, conf=0.15, roi_crop_size=None, roi_imgsz=320, backend='pytorch', int8=False,
+                 calibration_frames=None, input_size=640):
+        from ultralytics import YOLO
 
-    def interpolate_tennis_ball_positions(self, tennis_ball_positions):
-        tennis_ball_positions = [x.get(1, []) for x in tennis_ball_positions]
-        df_tennis_ball_positions = pd.DataFrame(tennis_ball_positions, columns=['x1', 'y1', 'x2', 'y2'])
-        df_tennis_ball_positions = df_tennis_ball_positions.interpolate()
-        df_tennis_ball_positions = df_tennis_ball_positions.bfill()
-        tennis_ball_positions = [{1: x} for x in df_tennis_ball_positions.to_numpy().tolist()]
-        return tennis_ball_positions
+        check_backend(backend)
+        if backend == 'pytorch':
+            self.model = YOLO(model_path)
+        else:
+            exported_path = export_tennis_ball_model(model_path, backend, int8=int8,
+                                                     calibration_frames=calibration_frames)
+            self.model = YOLO(exported_path, task='detect')
+        self.model_path = model_path
+        self.backend = backend
+        self.int8 = int8 and backend != 'pytorch'
+        self.conf = conf
+        self.roi_crop_size = roi_crop_size
+        self.roi_imgsz = roi_imgsz
+        self.input_size = input_size
+        self.last_detection_stats = None
+        self.last_decode_stats = None
+
+    def interpolate_tennis_ball_positions(self, tennis_ball_positions, online=False, max_delay=30, frame_size=None):
+        if online:
+            return interpolate_ball_track_online(tennis_ball_positions, max_delay=max_delay, frame_size=frame_size)
+        return interpolate_ball_track(as_ball_track(tennis_ball_positions))
 
     def get_tennis_ball_shot_frames(self, tennis_ball_positions):
-        tennis_ball_positions = [x.get(1, []) for x in tennis_ball_positions]
-        df_tennis_ball_positions = pd.DataFrame(tennis_ball_positions, columns=['x1', 'y1', 'x2', 'y2'])
-        df_tennis_ball_positions['tennis_ball_hit'] = 0
-        df_tennis_ball_positions['center_x'] = (df_tennis_ball_positions['x1'] + df_tennis_ball_positions['x2']) / 2
-        df_tennis_ball_positions['center_y'] = (df_tennis_ball_positions['y1'] + df_tennis_ball_positions['y2']) / 2
-        df_tennis_ball_positions['center_y_rolling_mean'] = df_tennis_ball_positions['center_y'].rolling(window=5,
-                                                                                                         min_periods=1, center=False).mean()
-        df_tennis_ball_positions['delta_y'] = df_tennis_ball_positions['center_y_rolling_mean'].diff()
-        minimum_change_frames_for_hit = 25
-        for i in range(1, len(df_tennis_ball_positions) - int(minimum_change_frames_for_hit * 1.2)):
-            neg_change = df_tennis_ball_positions['delta_y'].iloc[i] > 0 > df_tennis_ball_positions['delta_y'].iloc[
-                i + 1]
-            pos_change = df_tennis_ball_positions['delta_y'].iloc[i] < 0 < df_tennis_ball_positions['delta_y'].iloc[
-                i + 1]
-            if neg_change or pos_change:
-                change_count = 0
-                for cf in range(i + 1, i + int(minimum_change_frames_for_hit * 1.2) + 1):
-                    neg_change_follow = df_tennis_ball_positions['delta_y'].iloc[i] > 0 > \
-                                        df_tennis_ball_positions['delta_y'].iloc[cf]
-                    pos_change_follow = df_tennis_ball_positions['delta_y'].iloc[i] < 0 < \
-                                        df_tennis_ball_positions['delta_y'].iloc[cf]
-
-                    if neg_change and neg_change_follow:
-                        change_count += 1
-                    elif pos_change and pos_change_follow:
-                        change_count += 1
-
-                if change_count > minimum_change_frames_for_hit - 1:
-                    df_tennis_ball_positions.at[i, 'tennis_ball_hit'] = 1
-
-        frame_nums_with_ball_hits = df_tennis_ball_positions[df_tennis_ball_positions['tennis_ball_hit'] == 1].index.tolist()
+        centers = get_ball_track_centers(as_ball_track(tennis_ball_positions))
+        _, delta_y = get_vertical_movement(centers[:, 1])
+        frame_nums_with_ball_hits = detect_direction_changes(delta_y)
         return frame_nums_with_ball_hits
 
-    def detect_frames(self, frames, read_from_stub=False, stub_path=None):
-        tennis_ball_detections = []
+    def get_detection_params(self):
+        return get_detection_params(self.conf, self.roi_crop_size, self.roi_imgsz, self.backend, self.int8,
+                                    self.input_size)
+
+    def open_detector_frames(self, video_path, start_frame=0):
+        # ROI crops are cut from full resolution frames, so only full-frame detection gets downscaled input
+        if self.roi_crop_size:
+            return PrefetchDecoder(video_path, start_frame=start_frame)
+        return PrefetchDecoder(video_path, target_size=self.input_size, start_frame=start_frame)
+
+    def detect_video(self, video_path, cache=None, batch_size=8, checkpoint_every=256):
+        # The stats stay None when the detections come straight from the cache, so a reused tracker never reports
+        # the previous video's numbers
+        self.last_detection_stats = None
+        self.last_decode_stats = None
+        cache_key = None
+        if cache is not None:
+            # The key covers the video and model digests and the params, so a checkpoint only resumes a matching run
+            cache_key = cache.make_key(video_path, self.model_path, self.get_detection_params())
+            tennis_ball_detections = cache.load(cache_key)
+            if tennis_ball_detections is not None:
+                report_frames('detection', len(tennis_ball_detections), resumed=True)
+                return tennis_ball_detections
+
+        # A run on the same content elsewhere (another batch entry, the GUI worker and the CLI) may hold the
+        # checkpoints for this key; this run then detects without them and only stores the finished result
+        checkpoint_cache = cache if cache is not None and cache.acquire_partial(cache_key) else None
+        try:
+            tennis_ball_detections = self._detect_video_chunks(video_path, checkpoint_cache, cache_key, batch_size,
+                                                               checkpoint_every)
+            if cache is not None:
+                cache.store(cache_key, tennis_ball_detections)
+            if checkpoint_cache is not None:
+                checkpoint_cache.discard_partial(cache_key)
+        finally:
+            if checkpoint_cache is not None:
+                checkpoint_cache.release_partial(cache_key)
+        return tennis_ball_detections
+
+    def _detect_video_chunks(self, video_path, cache, cache_key, batch_size, checkpoint_every):
+        completed = cache.load_partial(cache_key) if cache is not None else None
+        chunks = [] if completed is None else [completed]
+        start_frame = 0 if completed is None else len(completed)
+        if start_frame:
+            report_frames('detection', start_frame, resumed=True)
+        detection_stats = {}
+        with self.open_detector_frames(video_path, start_frame=start_frame) as frames:
+            while True:
+                # ROI tracking picks up where the previous chunk, or the resumed checkpoint, left off
+                recent_centers = None
+                if self.roi_crop_size and chunks:
+                    recent_centers = self._get_recent_centers(chunks[-1], frames.scale)
+                chunk = self.detect_frames(islice(frames, checkpoint_every), batch_size=batch_size,
+                                           start_frame=start_frame, recent_centers=recent_centers)
+                if len(chunk) == 0:
+                    break
+                for name, value in self.last_detection_stats.items():
+                    detection_stats[name] = detection_stats.get(name, 0) + value
+                chunk['frame'] += start_frame
+                chunk['box'] /= frames.scale
+                if cache is not None:
+                    cache.append_partial(cache_key, chunk)
+                    report_event('chunk', stage='detection', start_frame=start_frame,
+                                 end_frame=start_frame + len(chunk))
+                chunks.append(chunk)
+                start_frame += len(chunk)
+        self.last_detection_stats = detection_stats
+        self.last_decode_stats = frames.get_stats()
+        return np.concatenate(chunks) if chunks else create_ball_track(0)
 
+    def detect_frames(self, frames, read_from_stub=False, stub_path=None, batch_size=8, start_frame=0,
+                      recent_centers=None):
         if read_from_stub is True and stub_path is not None:
             with open(stub_path, "rb") as f:
-                tennis_ball_detections = pickle.load(f)
-            return tennis_ball_detections
+                return as_ball_track(pickle.load(f))
+
+        with trace_span('detect_frames', roi=bool(self.roi_crop_size)):
+            if self.roi_crop_size:
+                boxes, confs = self.detect_frames_roi(frames, start_frame=start_frame, recent_centers=recent_centers)
+            else:
+                boxes, confs = self._detect_frames_batched(frames, batch_size)
 
-        for frame in frames:
-            player_dict = self.detect_frame(frame)
-            tennis_ball_detections.append(player_dict)
+        tennis_ball_track = create_ball_track(len(boxes))
+        tennis_ball_track['box'] = boxes
+        tennis_ball_track['conf'] = confs
+        tennis_ball_track['valid'] = ~np.isnan(boxes[:, 0])
 
         if stub_path is not None:
             with open(stub_path, "wb") as f:
-                pickle.dump(tennis_ball_detections, f)
+                pickle.dump(tennis_ball_track, f)
 
-        return tennis_ball_detections
+        return tennis_ball_track
+
+    def _detect_frames_batched(self, frames, batch_size):
+        boxes, confs = [np.empty((0, 4))], [np.empty(0, dtype=np.float32)]
+        frames = iter(frames)
+        while True:
+            with trace_span('decode_batch'):
+                batch = list(islice(frames, batch_size))
+            if not batch:
+                break
+            with trace_span('detect_batch', frames=len(batch)):
+                batch_boxes, batch_confs = self.detect_batch(batch)
+            report_frames('detection', len(batch))
+            boxes.append(batch_boxes)
+            confs.append(batch_confs)
+
+        boxes, confs = np.concatenate(boxes), np.concatenate(confs)
+        self.last_detection_stats = {'frames': len(boxes), 'full_frame_calls': len(boxes), 'roi_calls': 0,
+                                     'roi_detections': 0}
+        return boxes, confs
+
+    def detect_frames_roi(self, frames, start_frame=0, recent_centers=None):
+        boxes, confs = [], []
+        recent_centers = deque(recent_centers or (), maxlen=2)
+        stats = {'frames': 0, 'full_frame_calls': 0, 'roi_calls': 0, 'roi_detections': 0}
+
+        for frame_index, frame in enumerate(frames, start=start_frame):
+            stats['frames'] += 1
+            box, conf = None, 0.0
+
+            predicted_center = self._predict_ball_center(recent_centers, frame_index)
+            if predicted_center is not None:
+                stats['roi_calls'] += 1
+                box, conf = self._detect_in_crop(frame, predicted_center)
+                if box is not None:
+                    stats['roi_detections'] += 1
+
+            if box is None:
+                # The ball left the crop or was never found: search the whole frame
+                stats['full_frame_calls'] += 1
+                box, conf = self._get_tennis_ball_box(self.model.predict(frame, conf=self.conf)[0])
+
+            if box is None:
+                recent_centers.clear()
+                boxes.append((np.nan,) * 4)
+                confs.append(0.0)
+            else:
+                recent_centers.append((frame_index, (box[0] + box[2]) / 2, (box[1] + box[3]) / 2))
+                boxes.append(box)
+                confs.append(conf)
+            report_frames('detection')
+
+        self.last_detection_stats = stats
+        return np.array(boxes, dtype=np.float64).reshape(-1, 4), np.array(confs, dtype=np.float32)
+
+    def _get_recent_centers(self, tennis_ball_track, scale=1.0):
+        # The (frame, x, y) detections since the last miss, in detector coordinates, as detect_frames_roi keeps them
+        recent_centers = deque(maxlen=2)
+        for row in tennis_ball_track[-2:]:
+            if row['valid']:
+                x1, y1, x2, y2 = row['box'] * scale
+                recent_centers.append((int(row['frame']), (x1 + x2) / 2, (y1 + y2) / 2))
+            else:
+                recent_centers.clear()
+        return recent_centers
+
+    def _predict_ball_center(self, recent_centers, frame_index):
+        if not recent_centers:
+            return None
+        last_frame, last_x, last_y = recent_centers[-1]
+        if len(recent_centers) < 2:
+            return last_x, last_y
+        previous_frame, previous_x, previous_y = recent_centers[0]
+        steps = (frame_index - last_frame) / (last_frame - previous_frame)
+        return last_x + (last_x - previous_x) * steps, last_y + (last_y - previous_y) * steps
+
+    def _detect_in_crop(self, frame, center):
+        height, width = frame.shape[:2]
+        crop_size = min(self.roi_crop_size, width, height)
+        x0 = int(np.clip(center[0] - crop_size / 2, 0, width - crop_size))
+        y0 = int(np.clip(center[1] - crop_size / 2, 0, height - crop_size))
+        crop = frame[y0:y0 + crop_size, x0:x0 + crop_size]
+
+        box, conf = self._get_tennis_ball_box(self.model.predict(crop, conf=self.conf, imgsz=self.roi_imgsz)[0])
+        if box is None:
+            return None, 0.0
+        return [box[0] + x0, box[1] + y0, box[2] + x0, box[3] + y0], conf
+
+    def detect_batch(self, frames):
+        results = self.model.predict(list(frames), conf=self.conf)
+        boxes = np.full((len(results), 4), np.nan, dtype=np.float64)
+        confs = np.zeros(len(results), dtype=np.float32)
+        for i, result in enumerate(results):
+            box, conf = self._get_tennis_ball_box(result)
+            if box is not None:
+                boxes[i] = box
+                confs[i] = conf
+        return boxes, confs
+
+    def track_frames(self, frames, online_tracker=None):
+        # Yields (frame, box, conf, valid) rows as soon as the online tracker releases them
+        for frame_index, frame in enumerate(frames):
+            if online_tracker is None:
+                online_tracker = OnlineBallTracker(frame_size=(frame.shape[1], frame.shape[0]))
+            yield from online_tracker.update(frame_index, self.detect_frame_candidates(frame))
+        if online_tracker is not None:
+            yield from online_tracker.flush()
+
+    def detect_frame_candidates(self, frame):
+        results = self.model.predict(frame, conf=self.conf)[0]
+        if len(results.boxes) == 0:
+            return np.empty((0, 5))
+        return np.column_stack((results.boxes.xyxy.cpu().numpy(), results.boxes.conf.cpu().numpy()))
 
     def detect_frame(self, frame):
-        results = self.model.predict(frame, conf=0.15)[0]
-        tennis_ball_dict = {}
-        for box in results.boxes:
-            result = box.xyxy.tolist()[0]
-            tennis_ball_dict[1] = result
-        return tennis_ball_dict
-
-    def draw_bounding_boxes(self, video_frames, player_detections):
+        results = self.model.predict(frame, conf=self.conf)[0]
+        box, _ = self._get_tennis_ball_box(results)
+        return {1: box} if box is not None else {}
+
+    def _get_tennis_ball_box(self, results):
+        # Keeps the last box YOLO reports, as the dict-based detections did
+        if len(results.boxes) == 0:
+            return None, 0.0
+        box = results.boxes[-1]
+        return box.xyxy.tolist()[0], float(box.conf)
+
+    def draw_bounding_boxes(self, video_frames, tennis_ball_positions):
+        tennis_ball_track = as_ball_track(tennis_ball_positions)
         output_video_frames = []
-        for frame, tennis_ball_dict in zip(video_frames, player_detections):
-            for track_id, bbox in tennis_ball_dict.items():
-                x1, y1, x2, y2 = bbox
-                cv2.putText(frame, f"Ball", (int(x1), int(y1) - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-                cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
-            output_video_frames.append(frame)
-        return output_video_frames
\ No newline at end of file
+        for frame, tennis_ball_row in zip(video_frames, tennis_ball_track):
+            output_video_frames.append(self.draw_bounding_box(frame, tennis_ball_row))
+        return output_video_frames
+
+    def draw_bounding_box(self, frame, tennis_ball_row):
+        if tennis_ball_row['valid']:
+            x1, y1, x2, y2 = tennis_ball_row['box']
+            cv2.putText(frame, f"Ball", (int(x1), int(y1) - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+            cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+        return frame
@@ -1 +1,2 @@
 from .conversions import convert_meters_to_pixel_distance, convert_pixel_distance_to_meters
+from .hit_detection import detect_direction_changes, rolling_mean, get_vertical_movement
@@ -0,0 +1,43 @@
+import numpy as np
+
+
+def detect_direction_changes(delta_y, minimum_change_frames_for_hit=25):
+    delta_y = np.asarray(delta_y, dtype=np.float64)
+    window = int(minimum_change_frames_for_hit * 1.2)
+    last_frame = len(delta_y) - window
+    if last_frame <= 1:
+        return []
+
+    # NaN compares False against zero, matching the original loop
+    falling = delta_y < 0
+    rising = delta_y > 0
+    falling_count = np.concatenate(([0], np.cumsum(falling)))
+    rising_count = np.concatenate(([0], np.cumsum(rising)))
+
+    frames = np.arange(1, last_frame)
+    falling_after = falling_count[frames + window + 1] - falling_count[frames + 1]
+    rising_after = rising_count[frames + window + 1] - rising_count[frames + 1]
+
+    neg_change = rising[frames] & falling[frames + 1]
+    pos_change = falling[frames] & rising[frames + 1]
+    hits = (neg_change & (falling_after > minimum_change_frames_for_hit - 1)) | \
+           (pos_change & (rising_after > minimum_change_frames_for_hit - 1))
+    return frames[hits].tolist()
+
+
+def rolling_mean(values, window=5):
+    # Trailing mean with min_periods=1 that skips NaN, like pandas rolling(window, min_periods=1).mean()
+    values = np.asarray(values, dtype=np.float64)
+    padded = np.concatenate((np.full(window - 1, np.nan), values))
+    windows = np.lib.stride_tricks.sliding_window_view(padded, window)
+    counts = np.count_nonzero(~np.isnan(windows), axis=1)
+    sums = np.nansum(windows, axis=1)
+    means = np.full(len(values), np.nan)
+    np.divide(sums, counts, out=means, where=counts > 0)
+    return means
+
+
+def get_vertical_movement(center_y, window=5):
+    center_y_rolling_mean = rolling_mean(center_y, window)
+    delta_y = np.concatenate(([np.nan], np.diff(center_y_rolling_mean)))
+    return center_y_rolling_mean, delta_y